@@ -127,6 +127,7 @@
                 src = ./.;
                 propagatedBuildInputs = let ps = versions.python.pkgs; in [ 
                   ps.trio
+                  ps.outcome
                   ps.pytest
                   ps.setuptools
                   versions.vapoursynth 
@@ -161,6 +162,7 @@
               (versions.python.withPackages (ps: [
                 ps.flit
                 ps.trio
+                ps.outcome
                 ps.pytest
                 versions.vapoursynth
               ]))
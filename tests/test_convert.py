@@ -47,11 +47,14 @@ CHROMALOC_MAPPING = {
 
 
 class TestToRGB(unittest.TestCase):
-    def setUp(self) -> None:
+    # None of the tests touch the policy, so they can share one core.
+    @classmethod
+    def setUpClass(cls) -> None:
         forcefully_unregister_policy()
         use_standalone_policy()
 
-    def tearDown(self) -> None:
+    @classmethod
+    def tearDownClass(cls) -> None:
         forcefully_unregister_policy()
 
     def test_heuristics_provides_all_arguments(self):
@@ -105,6 +108,26 @@ class TestToRGB(unittest.TestCase):
             self.assertEqual(int(to_rgb(clip).format), vs.RGB24)
             self.assertEqual(int(to_rgb(clip, bits_per_sample=16).format), vs.RGB48)
 
+    def test_keeps_clips_in_target_format(self):
+        rgb24 = core.std.BlankClip(format=vs.RGB24)
+        rgb48 = core.std.BlankClip(format=vs.RGB48)
+
+        self.assertIs(to_rgb(rgb24), rgb24)
+        self.assertIs(to_rgb(rgb48, bits_per_sample=16), rgb48)
+        self.assertIsNot(to_rgb(rgb48), rgb48)
+
+    def test_only_resolves_scaler_for_subsampled_clips(self):
+        rgb24 = core.std.BlankClip(format=vs.RGB24)
+        self.assertIs(to_rgb(rgb24, scaler="DoesNotExist"), rgb24)
+
+        for fmt in [vs.GRAY8, vs.RGB48, vs.RGBS, vs.YUV444P8]:
+            clip = core.std.BlankClip(format=fmt)
+            self.assertEqual(int(to_rgb(clip, scaler="DoesNotExist").format), vs.RGB24)
+
+        yuv420 = core.std.BlankClip(format=vs.YUV420P8)
+        with self.assertRaises(AttributeError):
+            to_rgb(yuv420, scaler="DoesNotExist")
+
     def test_supports_float(self):
         # Test regression: Floating images cannot be shown.
         yuv_half = core.std.BlankClip(format=vs.YUV444PH)
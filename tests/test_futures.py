@@ -3,6 +3,7 @@
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
 
+import sys
 import unittest
 import threading
 import contextlib
@@ -10,7 +11,7 @@ from concurrent.futures import Future
 
 from vsengine._testutils import wrap_test_for_asyncio
 from vsengine._futures import UnifiedFuture, UnifiedIterator, unified
-from vsengine.loops import set_loop, NO_LOOP
+from vsengine.loops import set_loop, NO_LOOP, _NoEventLoop
 
 
 def resolve(value):
@@ -85,6 +86,42 @@ class TestUnifiedFuture(unittest.TestCase):
         with UnifiedFuture.from_call(contextmanager) as v:
             self.assertEqual(v, 1)
 
+    def test_from_future_leaves_plain_futures_alone(self):
+        fut = Future()
+        unified_fut = UnifiedFuture.from_future(fut)
+        self.assertIsNot(unified_fut, fut)
+        self.assertIs(type(fut), Future)
+
+        fut.set_result(1)
+        self.assertEqual(unified_fut.map(lambda v: v+1).result(), 2)
+
+    def test_from_future_forwards_other_futures(self):
+        class OtherFuture(Future):
+            pass
+
+        fut = OtherFuture()
+        unified_fut = UnifiedFuture.from_future(fut)
+        self.assertIsNot(unified_fut, fut)
+        self.assertFalse(unified_fut.done())
+
+        fut.set_result(1)
+        self.assertEqual(unified_fut.result(), 1)
+
+    def test_from_future_copies_finished_futures(self):
+        class OtherFuture(Future):
+            pass
+
+        fut = OtherFuture()
+        fut.set_result(1)
+        unified_fut = UnifiedFuture.from_future(fut)
+        self.assertIsNot(unified_fut, fut)
+        self.assertEqual(unified_fut.result(timeout=0), 1)
+
+        err = RuntimeError()
+        fut = OtherFuture()
+        fut.set_exception(err)
+        self.assertIs(UnifiedFuture.from_future(fut).exception(timeout=0), err)
+
     def test_map(self):
         def _crash(v):
             raise RuntimeError(str(v))
@@ -194,6 +231,18 @@ class UnifiedIteratorTest(unittest.TestCase):
         self.assertIs(state.result(), None)
         self.assertEqual(results, [1])
 
+    def test_run_as_completed_only_stops_on_false(self):
+        set_loop(NO_LOOP)
+        my_futures = [resolve(0), resolve(1)]
+        results = []
+        def _add_to_result(f):
+            results.append(f.result())
+            return f.result()
+
+        state = UnifiedIterator(iter(my_futures)).run_as_completed(_add_to_result)
+        self.assertTrue(state.done())
+        self.assertEqual(results, [0, 1])
+
     def test_run_as_completed_cancels_on_crash(self):
         set_loop(NO_LOOP)
         my_futures = [Future(), Future()]
@@ -250,6 +299,49 @@ class UnifiedIteratorTest(unittest.TestCase):
         self.assertTrue(state.done())
         self.assertIs(state.exception(), err)
 
+    def test_run_as_completed_fails_on_none(self):
+        def _noop(_):
+            pass
+        state = UnifiedIterator(iter([resolve(1), None])).run_as_completed(_noop)
+        self.assertTrue(state.done())
+        self.assertIsInstance(state.exception(), AttributeError)
+
+    def test_run_as_completed_passes_control_back_per_batch(self):
+        class CountingLoop(_NoEventLoop):
+            cycles = 0
+            def next_cycle(self):
+                self.cycles += 1
+                return super().next_cycle()
+
+        loop = CountingLoop()
+        set_loop(loop)
+        try:
+            results = []
+            def _add_to_result(f):
+                results.append(f.result())
+
+            class BatchedIterator(UnifiedIterator):
+                batch_size = 16
+
+            iterator = BatchedIterator(resolve(n) for n in range(40))
+            state = iterator.run_as_completed(_add_to_result)
+            self.assertIs(state.result(), None)
+            self.assertEqual(results, list(range(40)))
+            self.assertEqual(loop.cycles, 2)
+        finally:
+            set_loop(NO_LOOP)
+
+    def test_run_as_completed_does_not_recurse_on_finished_futures(self):
+        set_loop(NO_LOOP)
+        count = sys.getrecursionlimit() * 2
+        results = []
+        def _add_to_result(f):
+            results.append(f.result())
+
+        state = UnifiedIterator(resolve(n) for n in range(count)).run_as_completed(_add_to_result)
+        self.assertIs(state.result(), None)
+        self.assertEqual(len(results), count)
+
     def test_can_iter_futures(self):
         n = 0
         for fut in UnifiedIterator.from_call(future_iterator).futures:
@@ -276,6 +368,13 @@ class UnifiedIteratorTest(unittest.TestCase):
                 break
 
 
+    @wrap_test_for_asyncio
+    async def test_aiter_fails_on_none(self):
+        with self.assertRaises(AttributeError):
+            async for _ in UnifiedIterator(iter([None])):
+                pass
+
+
 class UnifiedFunctionTest(unittest.TestCase):
 
     def test_unified_auto_future_return_a_unified_future(self):
@@ -49,11 +49,14 @@ class TestUseInline(unittest.TestCase):
 
 
 class TestWrapVariable(unittest.TestCase):
-    def setUp(self) -> None:
+    # None of the tests touch the policy, so they can share one core.
+    @classmethod
+    def setUpClass(cls) -> None:
         forcefully_unregister_policy()
         use_standalone_policy()
 
-    def tearDown(self) -> None:
+    @classmethod
+    def tearDownClass(cls) -> None:
         forcefully_unregister_policy()
 
     def test_wrap_variable_bypasses_on_non_variable(self):
@@ -3,18 +3,38 @@
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
 
+import os
+import sys
+import inspect
 import contextlib
 import threading
 import unittest
 
 import asyncio
+import contextvars
 
-from concurrent.futures import Future, CancelledError
+from concurrent.futures import Future, CancelledError, ThreadPoolExecutor
 
+import vapoursynth
+
+from vsengine.policy import Policy, ThreadLocalStore
 from vsengine.loops import EventLoop, get_loop, set_loop, Cancelled
-from vsengine.loops import NO_LOOP, _NoEventLoop
+from vsengine.loops import NO_LOOP, _NoEventLoop, from_thread
 from vsengine.adapters.asyncio import AsyncIOLoop
 
+try:
+    import uvloop
+except ImportError:
+    new_event_loop = asyncio.new_event_loop
+else:
+    new_event_loop = uvloop.new_event_loop
+
+
+# The tests are run on the thread that imports this module.
+TEST_THREAD = threading.current_thread()
+
+TEST_VAR: contextvars.ContextVar[str] = contextvars.ContextVar("TEST_VAR")
+
 
 def make_async(func):
     def _wrapped(self, *args, **kwargs):
@@ -70,6 +90,13 @@ class AdapterTest:
                 with loop.wrap_cancelled():
                     raise RuntimeError()
 
+    @make_async
+    def test_from_thread_runs_inline_on_the_loop(self) -> None:
+        with self.with_loop() as loop:
+            fut = loop.from_thread(threading.get_ident)
+            self.assertTrue(fut.done())
+            self.assertEqual(fut.result(), threading.get_ident())
+
     @make_async
     def test_next_cycle_doesnt_throw_when_not_cancelled(self):
         with self.with_loop() as loop:
@@ -120,8 +147,8 @@ class AdapterTest:
             return threading.current_thread()
 
         with self.with_loop() as loop:
-            t2 = yield from self.resolve_to_thread_future(loop.to_thread(test_func))
-            self.assertNotEqual(threading.current_thread(), t2)
+            t2 = yield self.resolve_to_thread_future(loop.to_thread(test_func))
+            self.assertIsNot(TEST_THREAD, t2)
 
 
     @make_async
@@ -131,7 +158,7 @@ class AdapterTest:
         
         with self.with_loop() as loop:
             with self.assertRaises(RuntimeError):
-                yield from self.resolve_to_thread_future(loop.to_thread(test_func))
+                yield self.resolve_to_thread_future(loop.to_thread(test_func))
 
     @make_async
     def test_to_thread_forwards_correctly(self) -> None:
@@ -143,19 +170,53 @@ class AdapterTest:
             k = kwargs
 
         with self.with_loop() as loop:
-            yield from self.resolve_to_thread_future(loop.to_thread(test_func, 1, 2, 3, a="b", c="d"))
+            yield self.resolve_to_thread_future(loop.to_thread(test_func, 1, 2, 3, a="b", c="d"))
             self.assertEqual(a, (1,2,3))
             self.assertEqual(k, {"a": "b", "c": "d"})
 
 
 class AsyncAdapterTest(AdapterTest):
+    pool: ThreadPoolExecutor
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.pool = ThreadPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.pool.shutdown()
+        super().tearDownClass()
 
     def run_within_loop(self, func, args, kwargs):
         async def wrapped(_):
             result = func(self, *args, **kwargs)
-            if hasattr(result, "__iter__"):
-                for _ in result:
+            if not inspect.isgenerator(result):
+                return
+
+            # A bare yield passes control back to the loop once,
+            # otherwise the yielded awaitable is awaited and its outcome
+            # is sent back into the test.
+            value = None
+            error = None
+            while True:
+                try:
+                    if error is not None:
+                        awaitable = result.throw(error)
+                    else:
+                        awaitable = result.send(value)
+                except StopIteration:
+                    return
+
+                value = error = None
+                if awaitable is None:
                     await self.next_cycle()
+                    continue
+
+                try:
+                    value = await awaitable
+                except BaseException as e:
+                    error = e
 
         self.run_within_loop_async(wrapped, (), {})
 
@@ -167,6 +228,10 @@ class AsyncAdapterTest(AdapterTest):
 
     async def next_cycle(self):
         pass
+
+    # The to_thread-result of every async loop can simply be awaited.
+    async def resolve_to_thread_future(self, fut):
+        return await fut
     
     @is_async
     async def test_await_future_success(self):
@@ -174,7 +239,7 @@ class AsyncAdapterTest(AdapterTest):
             fut = Future()
             def _setter():
                 fut.set_result(1)
-            threading.Thread(target=_setter).start()
+            self.pool.submit(_setter)
             self.assertEqual(
                 await self.wait_for(loop.await_future(fut), 0.5),
                 1
@@ -187,7 +252,65 @@ class AsyncAdapterTest(AdapterTest):
             def _setter():
                 fut.set_exception(RuntimeError())
 
-            threading.Thread(target=_setter).start()
+            self.pool.submit(_setter)
+            with self.assertRaises(RuntimeError):
+                await self.wait_for(loop.await_future(fut), 0.5)
+
+    @is_async
+    async def test_from_thread_from_worker_runs_on_the_loop(self):
+        with self.with_loop() as loop:
+            submitted = self.pool.submit(loop.from_thread, threading.get_ident)
+            fut = await self.wait_for(loop.await_future(submitted), 0.5)
+            self.assertEqual(
+                await self.wait_for(loop.await_future(fut), 0.5),
+                threading.get_ident()
+            )
+
+    @is_async
+    async def test_from_thread_from_workers_keeps_order(self):
+        calls = []
+
+        def _submit(loop, worker):
+            return [loop.from_thread(calls.append, (worker, i)) for i in range(50)]
+
+        with self.with_loop() as loop:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                submitted = [pool.submit(_submit, loop, worker) for worker in range(4)]
+                for batch in submitted:
+                    for fut in await self.wait_for(loop.await_future(batch), 0.5):
+                        await self.wait_for(loop.await_future(fut), 0.5)
+
+        for worker in range(4):
+            self.assertEqual([i for w, i in calls if w == worker], list(range(50)))
+
+    @is_async
+    async def test_from_thread_from_worker_retains_environment(self):
+        def _submit(env):
+            with env.use():
+                return from_thread(vapoursynth.get_current_environment)
+
+        with self.with_loop() as loop:
+            with Policy(ThreadLocalStore()) as p:
+                with p.new_environment() as env1:
+                    submitted = self.pool.submit(_submit, env1)
+                    fut = await self.wait_for(loop.await_future(submitted), 0.5)
+                    self.assertEqual(
+                        await self.wait_for(loop.await_future(fut), 0.5),
+                        env1.vs_environment
+                    )
+
+    @is_async
+    async def test_await_future_already_done(self):
+        with self.with_loop() as loop:
+            fut = Future()
+            fut.set_result(1)
+            self.assertEqual(
+                await self.wait_for(loop.await_future(fut), 0.5),
+                1
+            )
+
+            fut = Future()
+            fut.set_exception(RuntimeError())
             with self.assertRaises(RuntimeError):
                 await self.wait_for(loop.await_future(fut), 0.5)
 
@@ -200,8 +323,16 @@ class NoLoopTest(AdapterTest, unittest.TestCase):
 
     def run_within_loop(self, func, args, kwargs):
         result = func(self, *args, **kwargs)
-        if hasattr(result, "__iter__"):
-            for _ in result: pass
+        if not inspect.isgenerator(result):
+            return
+
+        # Everything runs inline, so the yielded values are already resolved.
+        value = None
+        while True:
+            try:
+                value = result.send(value)
+            except StopIteration:
+                return
 
     @contextlib.contextmanager
     def assertCancelled(self):
@@ -209,49 +340,125 @@ class NoLoopTest(AdapterTest, unittest.TestCase):
             yield
 
     def resolve_to_thread_future(self, fut):
-        if False: yield
         return fut.result(timeout=0.5)
             
 
 class AsyncIOTest(AsyncAdapterTest, unittest.TestCase):
+    event_loop: asyncio.AbstractEventLoop
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        # Share one event-loop across all tests of this class.
+        # Prefer uvloop if it is installed.
+        cls.event_loop = new_event_loop()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        try:
+            cls.event_loop.run_until_complete(cls.event_loop.shutdown_default_executor())
+        finally:
+            cls.event_loop.close()
+            super().tearDownClass()
+
     def make_loop(self) -> AsyncIOLoop:
         return AsyncIOLoop()
 
     def run_within_loop_async(self, func, args, kwargs):
         async def wrapped():
             await func(self, *args, **kwargs)
-        asyncio.run(wrapped())
+        self.event_loop.run_until_complete(wrapped())
 
     async def next_cycle(self):
-        await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
 
-    async def wait_for(self, coro, timeout):
-        return await asyncio.wait_for(coro, timeout)
+    if sys.version_info >= (3, 11):
+        async def wait_for(self, coro, timeout):
+            # Unlike wait_for, this does not wrap the coroutine in a new task.
+            async with asyncio.timeout(timeout):
+                return await coro
+    else:
+        async def wait_for(self, coro, timeout):
+            return await asyncio.wait_for(coro, timeout)
 
     @contextlib.contextmanager
     def assertCancelled(self):
         with self.assertRaises(asyncio.CancelledError):
             yield
 
-    def resolve_to_thread_future(self, fut):
-        fut = asyncio.ensure_future(fut)
-        while not fut.done():
-            yield
-        return fut.result()
+    def test_from_thread_fails_queued_functions_on_closed_loop(self):
+        closed = new_event_loop()
+        closed.close()
+        loop = AsyncIOLoop(closed)
 
+        for _ in range(2):
+            # The second call must not assume a drain is still scheduled.
+            with self.assertRaises(RuntimeError):
+                loop.from_thread(lambda: None)
+        self.assertEqual(len(loop._pending), 0)
 
-try:
-    import trio
-except ImportError:
+    @is_async
+    async def test_from_thread_from_worker_keeps_context(self):
+        def _submit(loop):
+            TEST_VAR.set("worker")
+            return loop.from_thread(TEST_VAR.get)
+
+        TEST_VAR.set("loop")
+        with self.with_loop() as loop:
+            submitted = self.pool.submit(contextvars.copy_context().run, _submit, loop)
+            fut = await self.wait_for(loop.await_future(submitted), 0.5)
+            self.assertEqual(await self.wait_for(loop.await_future(fut), 0.5), "worker")
+        self.assertEqual(TEST_VAR.get(), "loop")
+
+    @is_async
+    async def test_from_thread_on_the_loop_waits_for_queued_functions(self):
+        calls = []
+
+        with self.with_loop() as loop:
+            # Block the loop until the worker has queued its function.
+            queued = self.pool.submit(loop.from_thread, calls.append, "worker").result(timeout=0.5)
+            fut = loop.from_thread(calls.append, "loop")
+            self.assertFalse(fut.done())
+
+            await self.wait_for(loop.await_future(queued), 0.5)
+            await self.wait_for(loop.await_future(fut), 0.5)
+
+        self.assertEqual(calls, ["worker", "loop"])
+
+    @is_async
+    async def test_await_future_already_cancelled(self):
+        with self.with_loop() as loop:
+            fut = Future()
+            fut.cancel()
+            with self.assertCancelled():
+                await self.wait_for(loop.await_future(fut), 0.5)
+
+
+def _import_trio():
+    # Importing trio pulls in a couple of dependencies of its own.
+    # Setting VSE_TEST_TRIO=0 skips the trio tests and the import cost.
+    if os.environ.get("VSE_TEST_TRIO", "1") == "0":
+        return None
+
+    try:
+        import trio
+        import trio.testing
+    except ImportError:
+        return None
+    return trio
+
+
+trio = _import_trio()
+if trio is None:
     print("Skipping trio")
 else:
     from vsengine.adapters.trio import TrioEventLoop
     class TrioTest(AsyncAdapterTest, unittest.TestCase):
-        def make_loop(self) -> AsyncIOLoop:
+        def make_loop(self) -> TrioEventLoop:
             return TrioEventLoop(self.nursery)
 
         async def next_cycle(self):
-            await trio.sleep(0.01)
+            await trio.testing.wait_all_tasks_blocked()
 
         def run_within_loop_async(self, func, args, kwargs):
             async def wrapped():
@@ -260,29 +467,6 @@ else:
                     await func(self, *args, **kwargs)
             trio.run(wrapped)
 
-        def resolve_to_thread_future(self, fut):
-            done = False
-            result = None
-            error = None
-            async def _awaiter():
-                nonlocal done, error, result
-                try:
-                    result = await fut
-                except BaseException as e:
-                    error = e
-                finally:
-                    done = True
-
-            self.nursery.start_soon(_awaiter)
-
-            while not done:
-                yield
-
-            if error is not None:
-                raise error
-            else:
-                return result
-
         async def wait_for(self, coro, timeout):
             with trio.fail_after(timeout):
                 return await coro
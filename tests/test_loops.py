@@ -3,21 +3,27 @@
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
 
-import queue
 import unittest
 import threading
-from concurrent.futures import Future, CancelledError
+import collections
+from concurrent.futures import Future, CancelledError, ThreadPoolExecutor
 
 import vapoursynth
 
 from vsengine._testutils import forcefully_unregister_policy
 from vsengine.policy import Policy, ThreadLocalStore
 
-from vsengine.loops import _NoEventLoop, Cancelled, from_thread, get_loop, set_loop
+from vsengine.loops import _NoEventLoop, Cancelled, get_loop, set_loop
 from vsengine.loops import to_thread, from_thread
 from vsengine.loops import EventLoop
 
 
+# The timeouts only guard against deadlocks. A passing test returns as
+# soon as the future resolves, so a generous value costs nothing and
+# keeps scheduling jitter on busy CI machines from failing the tests.
+RESULT_TIMEOUT = 1.0
+
+
 class FailingEventLoop:
     def attach(self):
         raise RuntimeError()
@@ -32,7 +38,8 @@ class SomeOtherLoop:
 
 class SpinLoop(EventLoop):
     def __init__(self) -> None:
-        self.queue = queue.Queue()
+        self.queue = collections.deque()
+        self.wakeup = threading.Event()
 
     def attach(self) -> None:
         pass
@@ -41,21 +48,33 @@ class SpinLoop(EventLoop):
         pass
 
     def run(self):
-        while (value := self.queue.get()) is not None:
-            future, func, args, kwargs = value
-            try:
-                result = func(*args, **kwargs)
-            except BaseException as e:
-                future.set_exception(e)
-            else:
-                future.set_result(result)
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+
+            # Drain everything that has been queued before waiting again.
+            while self.queue:
+                if (value := self.queue.popleft()) is None:
+                    return
+
+                future, func, args, kwargs = value
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+    def _put(self, value):
+        self.queue.append(value)
+        self.wakeup.set()
 
     def stop(self):
-        self.queue.put(None)
+        self._put(None)
 
     def from_thread(self, func, *args, **kwargs):
         fut = Future()
-        self.queue.put((fut, func, args, kwargs))
+        self._put((fut, func, args, kwargs))
         return fut
 
 
@@ -70,6 +89,15 @@ class NoLoopTest(unittest.TestCase):
 
 
 class LoopApiTest(unittest.TestCase):
+    pool: ThreadPoolExecutor
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.pool = ThreadPoolExecutor(max_workers=1)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.pool.shutdown()
 
     def tearDown(self) -> None:
         forcefully_unregister_policy()
@@ -95,8 +123,7 @@ class LoopApiTest(unittest.TestCase):
     def test_loop_from_thread_retains_environment(self):
         loop = SpinLoop()
         set_loop(loop)
-        thr = threading.Thread(target=loop.run)
-        thr.start()
+        runner = self.pool.submit(loop.run)
 
         def test():
             return vapoursynth.get_current_environment()
@@ -106,26 +133,25 @@ class LoopApiTest(unittest.TestCase):
                 with p.new_environment() as env1:
                     with env1.use():
                         fut = from_thread(test)
-                    self.assertEqual(fut.result(timeout=0.1), env1.vs_environment)
+                    self.assertEqual(fut.result(timeout=RESULT_TIMEOUT), env1.vs_environment)
         finally:
             loop.stop()
-            thr.join()
+            runner.result()
             set_loop(_NoEventLoop())
 
     def test_loop_from_thread_does_not_require_environment(self):
         loop = SpinLoop()
         set_loop(loop)
-        thr = threading.Thread(target=loop.run)
-        thr.start()
+        runner = self.pool.submit(loop.run)
 
         def test():
             pass
 
         try:
-            from_thread(test).result(timeout=0.1)
+            from_thread(test).result(timeout=RESULT_TIMEOUT)
         finally:
             loop.stop()
-            thr.join()
+            runner.result()
             set_loop(_NoEventLoop())
 
     def test_loop_to_thread_retains_environment(self):
@@ -136,12 +162,33 @@ class LoopApiTest(unittest.TestCase):
             with p.new_environment() as env1:
                 with env1.use():
                     fut = to_thread(test)
-                self.assertEqual(fut.result(timeout=0.1), env1.vs_environment)
+                self.assertEqual(fut.result(timeout=RESULT_TIMEOUT), env1.vs_environment)
 
     def test_loop_to_thread_does_not_require_environment(self):
         def test():
             pass
 
         fut = to_thread(test)
-        fut.result(timeout=0.1)
+        fut.result(timeout=RESULT_TIMEOUT)
+
+    def test_loop_to_thread_does_not_deadlock_when_pool_is_saturated(self):
+        # More functions than a default-sized pool has workers wait for each other.
+        count = 64
+        barrier = threading.Barrier(count)
+        def test():
+            barrier.wait(timeout=RESULT_TIMEOUT * 5)
+
+        set_loop(_NoEventLoop())
+        futs = [to_thread(test) for _ in range(count)]
+        for fut in futs:
+            fut.result(timeout=RESULT_TIMEOUT * 5)
+
+    def test_loop_to_thread_uses_the_executor_of_the_loop(self):
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="custom-executor") as executor:
+            set_loop(_NoEventLoop(executor))
+            try:
+                fut = to_thread(lambda: threading.current_thread().name)
+                self.assertTrue(fut.result(timeout=RESULT_TIMEOUT).startswith("custom-executor"))
+            finally:
+                set_loop(_NoEventLoop())
 
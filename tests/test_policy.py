@@ -57,16 +57,19 @@ class PolicyTest(unittest.TestCase):
             pass
 
 
-class ManagedEnvironmentTest(unittest.TestCase):
+# Tests that never switch the current environment can share one policy.
+class ManagedEnvironmentSharedTest(unittest.TestCase):
 
-    def setUp(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
         forcefully_unregister_policy()
-        self.store = GlobalStore()
-        self.policy = Policy(self.store)
-        self.policy.register()
+        cls.store = GlobalStore()
+        cls.policy = Policy(cls.store)
+        cls.policy.register()
 
-    def tearDown(self) -> None:
-        self.policy.unregister()
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.policy.unregister()
 
     def test_new_environment_warns_on_del(self):
         env = self.policy.new_environment()
@@ -78,6 +81,34 @@ class ManagedEnvironmentTest(unittest.TestCase):
         env.dispose()
         self.assertRaises(RuntimeError, lambda: env.use().__enter__())
 
+    def test_environment_can_capture_outputs(self):
+        with self.policy.new_environment() as env1:
+            with self.policy.new_environment() as env2:
+                with env1.use():
+                    vapoursynth.core.std.BlankClip().set_output(0)
+
+                self.assertEqual(len(env1.outputs), 1)
+                self.assertEqual(len(env2.outputs), 0)
+
+    def test_environment_can_capture_cores(self):
+        with self.policy.new_environment() as env1:
+            with self.policy.new_environment() as env2:
+                self.assertNotEqual(env1.core, env2.core)
+
+
+# Tests that switch the current environment or require that none is set
+# get a fresh policy each.
+class ManagedEnvironmentIsolatedTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        forcefully_unregister_policy()
+        self.store = GlobalStore()
+        self.policy = Policy(self.store)
+        self.policy.register()
+
+    def tearDown(self) -> None:
+        self.policy.unregister()
+
     def test_new_environment_can_use_context(self):
         with self.policy.new_environment() as env:
             self.assertRaises(vapoursynth.Error, lambda: vapoursynth.core.std.BlankClip().set_output(0))
@@ -94,20 +125,6 @@ class ManagedEnvironmentTest(unittest.TestCase):
         vapoursynth.core.std.BlankClip().set_output(0)
         env.dispose()
 
-    def test_environment_can_capture_outputs(self):
-        with self.policy.new_environment() as env1:
-            with self.policy.new_environment() as env2:
-                with env1.use():
-                    vapoursynth.core.std.BlankClip().set_output(0)
-
-                self.assertEqual(len(env1.outputs), 1)
-                self.assertEqual(len(env2.outputs), 0)
-
-    def test_environment_can_capture_cores(self):
-        with self.policy.new_environment() as env1:
-            with self.policy.new_environment() as env2:
-                self.assertNotEqual(env1.core, env2.core)
-
     def test_inline_section_is_invisible(self):
         with self.policy.new_environment() as env1:
             with self.policy.new_environment() as env2:
@@ -3,6 +3,7 @@
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
 import unittest
+import typing as t
 
 import concurrent.futures as futures
 from contextvars import copy_context
@@ -11,6 +12,32 @@ from vsengine.policy import GlobalStore, ThreadLocalStore, ContextVarStore
 from vsengine.policy import EnvironmentStore
 
 
+STORES: t.Mapping[str, t.Callable[[], EnvironmentStore]] = {
+    "GlobalStore": GlobalStore,
+    "ThreadLocalStore": ThreadLocalStore,
+    "ContextVarStore": lambda: ContextVarStore("store_test"),
+}
+
+
+class TestStores(unittest.TestCase):
+
+    def test_basic_functionality(self):
+        for name, create_store in STORES.items():
+            with self.subTest(store=name):
+                store = create_store()
+                try:
+                    self.assertEqual(store.get_current_environment(), None)
+
+                    store.set_current_environment(1)
+                    self.assertEqual(store.get_current_environment(), 1)
+                    store.set_current_environment(2)
+                    self.assertEqual(store.get_current_environment(), 2)
+                    store.set_current_environment(None)
+                    self.assertEqual(store.get_current_environment(), None)
+                finally:
+                    store.set_current_environment(None)
+
+
 class BaseStoreTest:
 
     def create_store(self) -> EnvironmentStore:
@@ -22,22 +49,6 @@ class BaseStoreTest:
     def tearDown(self) -> None:
         self.store.set_current_environment(None)
 
-    def test_basic_functionality(self):
-        self.assertEqual(self.store.get_current_environment(), None)
-
-        self.store.set_current_environment(1)
-        self.assertEqual(self.store.get_current_environment(), 1)
-        self.store.set_current_environment(2)
-        self.assertEqual(self.store.get_current_environment(), 2)
-        self.store.set_current_environment(None)
-        self.assertEqual(self.store.get_current_environment(), None)
-
-
-class TestGlobalStore(BaseStoreTest, unittest.TestCase):
-
-    def create_store(self) -> EnvironmentStore:
-        return GlobalStore()
-
 
 class TestThreadLocalStore(BaseStoreTest, unittest.TestCase):
 
@@ -1,44 +1,68 @@
 import os
 import sys
-import platform
 import unittest
 import subprocess
 
+from vsengine._testutils import FixtureProcesses
+
 
 DIR = os.path.dirname(__file__)
 PATH = os.path.join(DIR, "fixtures")
 
+# The inputs do not change between fixtures, so build the environment once.
+FIXTURE_PYTHONPATH = os.pathsep.join([
+    PATH,
+    os.environ["PYTHONPATH"] if "PYTHONPATH" in os.environ else os.path.abspath("..")
+])
+# Only load the plugin under test instead of every installed pytest plugin.
+FIXTURE_ENV = {**os.environ, "PYTHONPATH": FIXTURE_PYTHONPATH, "PYTEST_DISABLE_PLUGIN_AUTOLOAD": "1"}
 
-def run_fixture(fixture: str, expect_status: int = 0):
-    path = os.path.join(PATH)
-    if "PYTHONPATH" in os.environ:
-        path += os.pathsep + os.environ["PYTHONPATH"]
-    else:
-        path += os.pathsep + os.path.abspath(os.path.join(".."))
-
-    env = {**os.environ, "PYTHONPATH" : path}
 
-    process = subprocess.run(
-        [sys.executable, "-m", "pytest", os.path.join(PATH, f"{fixture}.py"), "-o", "cache_dir=/build/.cache"],
+def start_fixture(fixture: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "pytest", os.path.join(PATH, f"{fixture}.py"),
+            "-p", "no:cacheprovider",
+            "-p", "vsengine.tests.pytest"
+        ],
         stderr=subprocess.STDOUT,
         stdout=subprocess.PIPE,
-        env=env
+        env=FIXTURE_ENV
     )
+
+
+def wait_fixture(process: subprocess.Popen, expect_status: int = 0):
+    stdout, _ = process.communicate()
     if process.returncode != expect_status:
         print()
-        print(process.stdout.decode(sys.getdefaultencoding()), file=sys.stderr)
+        print(stdout.decode(sys.getdefaultencoding()), file=sys.stderr)
         print()
         assert False, f"Process exited with status {process.returncode}"
 
 
 class TestUnittestWrapper(unittest.TestCase):
-    
+    FIXTURES = (
+        "pytest_core_in_module",
+        "pytest_core_stored_in_test",
+        "pytest_core_succeeds",
+    )
+
+    processes: FixtureProcesses
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # The fixtures are independent of each other.
+        cls.processes = FixtureProcesses(start_fixture, cls.FIXTURES)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.processes.close()
+
     def test_core_in_module(self):
-        run_fixture("pytest_core_in_module", 2)
+        wait_fixture(self.processes["pytest_core_in_module"], 2)
 
     def test_stored_in_test(self):
-        run_fixture("pytest_core_stored_in_test", 1)
+        wait_fixture(self.processes["pytest_core_stored_in_test"], 1)
 
     def test_succeeds(self):
-        run_fixture("pytest_core_succeeds", 0)
-
+        wait_fixture(self.processes["pytest_core_succeeds"], 0)
@@ -3,41 +3,80 @@ import sys
 import unittest
 import subprocess
 
+from vsengine._testutils import FixtureProcesses
+
 
 DIR = os.path.dirname(__file__)
 PATH = os.path.join(DIR, "fixtures")
 
+# The inputs do not change between fixtures, so build the environment once.
+FIXTURE_PYTHONPATH = os.pathsep.join([
+    PATH,
+    os.environ["PYTHONPATH"] if "PYTHONPATH" in os.environ else os.path.abspath("..")
+])
+FIXTURE_ENV = {**os.environ, "PYTHONPATH": FIXTURE_PYTHONPATH}
 
-def run_fixture(fixture: str, expect_status: int = 0):
-    path = os.path.join(PATH)
-    if "PYTHONPATH" in os.environ:
-        path += os.pathsep + os.environ["PYTHONPATH"]
-    else:
-        path += os.pathsep + os.path.abspath(os.path.join(".."))
-
-    env = {**os.environ, "PYTHONPATH" : path}
 
-    process = subprocess.run(
+# Every fixture needs a fresh interpreter: the runner registers a policy
+# for the lifetime of the process and cores that are left alive are frozen
+# in the hospice, so reusing a worker would leak state into the next fixture.
+def start_fixture(fixture: str, expect_status: int = 0) -> subprocess.Popen:
+    # The output of a succeeding fixture is never read.
+    return subprocess.Popen(
         [sys.executable, "-m", "vsengine.tests.unittest", fixture],
         stderr=subprocess.STDOUT,
-        stdout=subprocess.PIPE,
-        env=env
+        stdout=subprocess.DEVNULL if expect_status == 0 else subprocess.PIPE,
+        env=FIXTURE_ENV
     )
-    if process.returncode != expect_status:
-        print()
-        print(process.stdout.decode(sys.getdefaultencoding()), file=sys.stderr)
-        print()
-        assert False, f"Process exited with status {process.returncode}"
+
+
+def wait_fixture(process: subprocess.Popen, expect_status: int = 0):
+    stdout, _ = process.communicate()
+    if process.returncode == expect_status:
+        return
+
+    if stdout is None:
+        # Run it again to capture the output for the report.
+        stdout = subprocess.run(
+            process.args,
+            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE,
+            env=FIXTURE_ENV
+        ).stdout
+
+    print()
+    print(stdout.decode(sys.getdefaultencoding()), file=sys.stderr)
+    print()
+    assert False, f"Process exited with status {process.returncode}"
 
 
 class TestUnittestWrapper(unittest.TestCase):
-    
+    # Maps each fixture to the status it is expected to exit with.
+    FIXTURES = {
+        "unittest_core_in_module": 1,
+        "unittest_core_stored_in_test": 2,
+        "unittest_core_succeeds": 0,
+    }
+
+    processes: FixtureProcesses
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # The fixtures are independent of each other.
+        cls.processes = FixtureProcesses(
+            lambda fixture: start_fixture(fixture, cls.FIXTURES[fixture]),
+            cls.FIXTURES
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.processes.close()
+
     def test_core_in_module(self):
-        run_fixture("unittest_core_in_module", 1)
+        wait_fixture(self.processes["unittest_core_in_module"], self.FIXTURES["unittest_core_in_module"])
 
     def test_stored_in_test(self):
-        run_fixture("unittest_core_stored_in_test", 2)
+        wait_fixture(self.processes["unittest_core_stored_in_test"], self.FIXTURES["unittest_core_stored_in_test"])
 
     def test_succeeds(self):
-        run_fixture("unittest_core_succeeds", 0)
-
+        wait_fixture(self.processes["unittest_core_succeeds"], self.FIXTURES["unittest_core_succeeds"])
@@ -4,11 +4,12 @@
 # SPDX-License-Identifier: EUPL-1.2
 import typing as t
 import unittest
+import functools
 
 from vsengine._testutils import forcefully_unregister_policy, use_standalone_policy
 
 from vapoursynth import core, PresetFormat, VideoFormat, GRAY8, RGB24
-from vapoursynth import VideoNode, VideoFrame
+from vapoursynth import VideoNode
 
 from vsengine.video import frame, planes, frames, render
 
@@ -17,22 +18,27 @@ AnyFormat = t.Union[PresetFormat, VideoFormat]
 
 
 class TestVideo(unittest.TestCase):
-    def setUp(self) -> None:
+    # The clips are cached across tests, so the core has to outlive them.
+    @classmethod
+    def setUpClass(cls) -> None:
         forcefully_unregister_policy()
         use_standalone_policy()
 
-    def tearDown(self) -> None:
+    @classmethod
+    def tearDownClass(cls) -> None:
+        # Release the cached clips before the core is torn down.
+        cls.generate_video.cache_clear()
         forcefully_unregister_policy()
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def generate_video(length: int = 3, width: int = 1, height: int = 1, format: AnyFormat = GRAY8) -> VideoNode:
         clip = core.std.BlankClip(length=length, width=width, height=height, format=format, fpsden=1001, fpsnum=24000)
-        def _add_frameno(n: int, f: VideoFrame) -> VideoFrame:
-            fout = f.copy()
-            fout.props["FrameNumber"] = n
-            return fout
-        clip = core.std.ModifyFrame(clip=clip, clips=clip, selector=_add_frameno)
-        return clip
+        # Stamp the frame numbers inside VapourSynth instead of calling back into python for every frame.
+        return core.std.Splice([
+            clip[n].std.SetFrameProp(prop="FrameNumber", intval=n)
+            for n in range(length)
+        ])
 
     def test_planes(self):
         clipA = core.std.BlankClip(length=1, color=[0, 1, 2], width=1, height=1, format=RGB24)
@@ -40,17 +46,25 @@ class TestVideo(unittest.TestCase):
         
         clip = core.std.Splice([clipA, clipB])
 
-        self.assertEqual(planes(clip, 0).result(), [b"\x00", b"\x01", b"\x02"])
-        self.assertEqual(planes(clip, 0, planes=[0]).result(), [b"\x00"])
-        self.assertEqual(planes(clip, 0, planes=[1]).result(), [b"\x01"])
-        self.assertEqual(planes(clip, 0, planes=[2]).result(), [b"\x02"])
-        self.assertEqual(planes(clip, 0, planes=[2, 1, 0]).result(), [b"\x02", b"\x01", b"\x00"])
-
-        self.assertEqual(planes(clip, 1).result(), [b"\x03", b"\x04", b"\x05"])
-        self.assertEqual(planes(clip, 1, planes=[0]).result(), [b"\x03"])
-        self.assertEqual(planes(clip, 1, planes=[1]).result(), [b"\x04"])
-        self.assertEqual(planes(clip, 1, planes=[2]).result(), [b"\x05"])
-        self.assertEqual(planes(clip, 1, planes=[2, 1, 0]).result(), [b"\x05", b"\x04", b"\x03"])
+        expected = [
+            (0, None, [b"\x00", b"\x01", b"\x02"]),
+            (0, [0], [b"\x00"]),
+            (0, [1], [b"\x01"]),
+            (0, [2], [b"\x02"]),
+            (0, [2, 1, 0], [b"\x02", b"\x01", b"\x00"]),
+
+            (1, None, [b"\x03", b"\x04", b"\x05"]),
+            (1, [0], [b"\x03"]),
+            (1, [1], [b"\x04"]),
+            (1, [2], [b"\x05"]),
+            (1, [2, 1, 0], [b"\x05", b"\x04", b"\x03"]),
+        ]
+
+        # Submit every request before waiting so VapourSynth can serve them concurrently.
+        futures = [planes(clip, frameno, planes=selected) for frameno, selected, _ in expected]
+        for fut, (frameno, selected, result) in zip(futures, expected):
+            with self.subTest(frameno=frameno, planes=selected):
+                self.assertEqual(fut.result(), result)
 
     def test_planes_default_supports_multiformat_clips(self):
         clipA = core.std.BlankClip(length=1, color=[0, 1, 2], width=1, height=1, format=RGB24)
@@ -62,19 +76,20 @@ class TestVideo(unittest.TestCase):
 
     def test_single_frame(self):
         clip = self.generate_video()
-        with frame(clip, 0).result(timeout=0.1) as f:
-            self.assertEqual(f.props["FrameNumber"], 0)
-
-        with frame(clip, 1).result(timeout=0.1) as f:
-            self.assertEqual(f.props["FrameNumber"], 1)
-        
-        with frame(clip, 2).result(timeout=0.1) as f:
-            self.assertEqual(f.props["FrameNumber"], 2)
+        # Request all frames up front so VapourSynth can render them concurrently.
+        futures = [frame(clip, n) for n in range(3)]
+        for n, fut in enumerate(futures):
+            with fut.result(timeout=0.3) as f:
+                self.assertEqual(f.props["FrameNumber"], n)
 
     def test_multiple_frames(self):
         clip = self.generate_video()
-        for nf, f in enumerate(frames(clip)):
-            self.assertEqual(f.props["FrameNumber"], nf)
+        for close in (True, False):
+            with self.subTest(close=close):
+                for nf, f in enumerate(frames(clip, close=close)):
+                    self.assertEqual(f.props["FrameNumber"], nf)
+                    if not close:
+                        f.close()
 
     def test_multiple_frames_closes_after_iteration(self):
         clip = self.generate_video()
@@ -94,20 +109,18 @@ class TestVideo(unittest.TestCase):
         finally:
             f2.close()
             next(it).close()
-    
-    def test_multiple_frames_without_closing(self):
-        clip = self.generate_video()
-        for nf, f in enumerate(frames(clip, close=False)):
-            self.assertEqual(f.props["FrameNumber"], nf)
-            f.close()
 
     def test_render(self):
         clip = self.generate_video()
-        data = b"".join((f[1] for f in render(clip)))
+        data = bytearray()
+        for _, chunk in render(clip):
+            data += chunk
         self.assertEqual(data, b"\0\0\0")
 
     def test_render_y4m(self):
         clip = self.generate_video()
-        data = b"".join((f[1] for f in render(clip, y4m=True)))
+        data = bytearray()
+        for _, chunk in render(clip, y4m=True):
+            data += chunk
         self.assertEqual(data, b"YUV4MPEG2 Cmono W1 H1 F24000:1001 Ip A0:0 XLENGTH=3\nFRAME\n\0FRAME\n\0FRAME\n\0")
 
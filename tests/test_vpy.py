@@ -4,7 +4,9 @@
 # SPDX-License-Identifier: EUPL-1.2
 
 import os
+import sys
 import ast
+import asyncio
 import types
 import unittest
 import textwrap
@@ -24,6 +26,23 @@ from vsengine.vpy import inline_runner, ExecutionFailed, WrapAllErrors
 DIR = os.path.dirname(__file__)
 PATH = os.path.join(DIR, "fixtures", "test.vpy")
 
+CODE_STR = textwrap.dedent("""
+    from vsengine._testutils import BLACKBOARD
+    BLACKBOARD["vpy_test_runs_raw_code_str"] = True
+""")
+
+CODE_BYTES = textwrap.dedent("""
+    # encoding: latin-1
+    from vsengine._testutils import BLACKBOARD
+    BLACKBOARD["vpy_test_runs_raw_code_bytes"] = True
+""").encode("latin-1")
+
+# compile() does not modify the tree, so it can be shared.
+CODE_AST = ast.parse(textwrap.dedent("""
+    from vsengine._testutils import BLACKBOARD
+    BLACKBOARD["vpy_test_runs_raw_code_ast"] = True
+"""))
+
 
 @contextlib.contextmanager
 def noop():
@@ -42,12 +61,34 @@ def callback_script(func):
 
 class ScriptTest(unittest.TestCase):
 
-    def setUp(self) -> None:
+    # Every test creates its own environments, so they can share one policy.
+    @classmethod
+    def setUpClass(cls) -> None:
         forcefully_unregister_policy()
+        cls.policy = Policy(GlobalStore())
+        cls.policy.register()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.policy.unregister()
+
+    def setUp(self) -> None:
+        # Scripts can change globals and core state, so no test reuses them.
+        self.environment = self.policy.new_environment()
+
+        # The event loop is not shared between tests either.
+        if sys.version_info >= (3, 11):
+            self.asyncio_runner = asyncio.Runner()
+        else:
+            self.asyncio_runner = None
 
     def tearDown(self) -> None:
-        forcefully_unregister_policy()
-        set_loop(NO_LOOP)
+        try:
+            if self.asyncio_runner is not None:
+                self.asyncio_runner.close()
+        finally:
+            self.environment.dispose()
+            set_loop(NO_LOOP)
 
     def test_run_executes_successfully(self):
         run = False
@@ -56,10 +97,8 @@ class ScriptTest(unittest.TestCase):
             nonlocal run
             run = True
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                script.run()
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        script.run()
         self.assertTrue(run)
 
     def test_run_wraps_exception(self):
@@ -67,12 +106,10 @@ class ScriptTest(unittest.TestCase):
         def test_code(_):
             raise TestException()
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                fut = script.run()
-                self.assertIsInstance(fut.exception(), ExecutionFailed)
-                self.assertIsInstance(fut.exception().parent_error, TestException)
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        fut = script.run()
+        self.assertIsInstance(fut.exception(), ExecutionFailed)
+        self.assertIsInstance(fut.exception().parent_error, TestException)
 
     def test_execute_resolves_immediately(self):
         run = False
@@ -81,10 +118,8 @@ class ScriptTest(unittest.TestCase):
             nonlocal run
             run = True
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                script.result()
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        script.result()
         self.assertTrue(run)
 
     def test_execute_resolves_to_script(self):
@@ -92,27 +127,23 @@ class ScriptTest(unittest.TestCase):
         def test_code(_):
             pass
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                self.assertIs(script.result(), script)
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        self.assertIs(script.result(), script)
 
     def test_execute_resolves_immediately_when_raising(self):
         @callback_script
         def test_code(_):
             raise TestException
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                try:
-                    script.result()
-                except ExecutionFailed as err:
-                    self.assertIsInstance(err.parent_error, TestException)
-                except Exception as e:
-                    self.fail(f"Wrong exception: {e!r}")
-                else:
-                    self.fail("Test execution didn't fail properly.")
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        try:
+            script.result()
+        except ExecutionFailed as err:
+            self.assertIsInstance(err.parent_error, TestException)
+        except Exception as e:
+            self.fail(f"Wrong exception: {e!r}")
+        else:
+            self.fail("Test execution didn't fail properly.")
 
     @wrap_test_for_asyncio
     async def test_run_async(self):
@@ -122,10 +153,8 @@ class ScriptTest(unittest.TestCase):
             nonlocal run
             run = True
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                await script.run_async()
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        await script.run_async()
         self.assertTrue(run)
 
     @wrap_test_for_asyncio
@@ -136,58 +165,50 @@ class ScriptTest(unittest.TestCase):
             nonlocal run
             run = True
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                await Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
+        await Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
         self.assertTrue(run)
 
     def test_cant_dispose_non_managed_environments(self):
         @callback_script
         def test_code(_):
             pass
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                script = Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner)
-                with self.assertRaises(ValueError):
-                    script.dispose()
+        script = Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner)
+        with self.assertRaises(ValueError):
+            script.dispose()
 
     def test_disposes_managed_environment(self):
         @callback_script
         def test_code(_):
             pass
-        with Policy(GlobalStore()) as p:
-            env = p.new_environment()
-            script = Script(test_code, types.ModuleType("__test__"), env, inline_runner)
+        env = self.policy.new_environment()
+        script = Script(test_code, types.ModuleType("__test__"), env, inline_runner)
 
-            try:
-                script.dispose()
-            except:
-                env.dispose()
-                raise
+        try:
+            script.dispose()
+        except:
+            env.dispose()
+            raise
 
     def test_noop_context_manager_for_non_managed_environments(self):
         @callback_script
         def test_code(_):
             pass
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with Script(test_code, types.ModuleType("__test__"), env.vs_environment, inline_runner) as s:
-                    pass
-                self.assertFalse(env.disposed)
+        with Script(test_code, types.ModuleType("__test__"), self.environment.vs_environment, inline_runner) as s:
+            pass
+        self.assertFalse(self.environment.disposed)
 
     def test_disposing_context_manager_for_managed_environments(self):
         @callback_script
         def test_code(_):
             pass
-        with Policy(GlobalStore()) as p:
-            env = p.new_environment()
-            with Script(test_code, types.ModuleType("__test__"), env, inline_runner):
-                pass
-            try:
-                self.assertTrue(env.disposed)
-            except:
-                env.dispose()
-                raise
+        env = self.policy.new_environment()
+        with Script(test_code, types.ModuleType("__test__"), env, inline_runner):
+            pass
+        try:
+            self.assertTrue(env.disposed)
+        except:
+            env.dispose()
+            raise
 
     def test_chdir_changes_chdir(self):
         curdir = None
@@ -217,11 +238,9 @@ class ScriptTest(unittest.TestCase):
             nonlocal vpy_env
             vpy_env = vapoursynth.get_current_environment()
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    _load(test_code, None, inline=False, chdir=None).result()
-                    self.assertEqual(vpy_env, env.vs_environment)
+        with self.environment.use():
+            _load(test_code, None, inline=False, chdir=None).result()
+            self.assertEqual(vpy_env, self.environment.vs_environment)
 
     def test_load_creates_new_environment(self):
         vpy_env = None
@@ -230,13 +249,12 @@ class ScriptTest(unittest.TestCase):
             nonlocal vpy_env
             vpy_env = vapoursynth.get_current_environment()
 
-        with Policy(GlobalStore()) as p:
-            script = _load(test_code, p, inline=True, chdir=None)
-            try:
-                script.result()
-                self.assertEqual(vpy_env, script.environment.vs_environment)
-            finally:
-                script.dispose()
+        script = _load(test_code, self.policy, inline=True, chdir=None)
+        try:
+            script.result()
+            self.assertEqual(vpy_env, script.environment.vs_environment)
+        finally:
+            script.dispose()
 
     def test_load_chains_script(self):
         @callback_script
@@ -248,15 +266,14 @@ class ScriptTest(unittest.TestCase):
         def test_code_2(module):
             self.assertEqual(module.test, True)
 
-        with Policy(GlobalStore()) as p:
-            script1 = _load(test_code_1, p, inline=True, chdir=None)
-            env = script1.environment
-            try:
-                script1.result()
-                script2 = _load(test_code_2, script1, inline=True, chdir=None)
-                script2.result()
-            finally:
-                env.dispose()
+        script1 = _load(test_code_1, self.policy, inline=True, chdir=None)
+        env = script1.environment
+        try:
+            script1.result()
+            script2 = _load(test_code_2, script1, inline=True, chdir=None)
+            script2.result()
+        finally:
+            env.dispose()
 
     def test_load_with_custom_name(self):
         @callback_script
@@ -267,18 +284,17 @@ class ScriptTest(unittest.TestCase):
         def test_code_2(module):
             self.assertEqual(module.__name__, "__test_2__")
 
-        with Policy(GlobalStore()) as p:
-            try:
-                script1 = _load(test_code_1, p, module_name="__test_1__")
-                script1.result()
-            finally:
-                script1.dispose()
+        try:
+            script1 = _load(test_code_1, self.policy, module_name="__test_1__")
+            script1.result()
+        finally:
+            script1.dispose()
 
-            try:
-                script2 = _load(test_code_2, p, module_name="__test_2__")
-                script2.result()
-            finally:
-                script2.dispose()
+        try:
+            script2 = _load(test_code_2, self.policy, module_name="__test_2__")
+            script2.result()
+        finally:
+            script2.dispose()
 
     def test_load_runs_chdir(self):
         curdir = None
@@ -287,13 +303,11 @@ class ScriptTest(unittest.TestCase):
             nonlocal curdir
             curdir = os.getcwd()
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    previous = os.getcwd()
-                    _load(test_code, None, inline=True, chdir=DIR).result()
-                    self.assertEqual(curdir, DIR)
-                    self.assertEqual(os.getcwd(), previous)
+        with self.environment.use():
+            previous = os.getcwd()
+            _load(test_code, None, inline=True, chdir=DIR).result()
+            self.assertEqual(curdir, DIR)
+            self.assertEqual(os.getcwd(), previous)
 
     def test_load_runs_in_thread_when_requested(self):
         thread = None
@@ -302,11 +316,9 @@ class ScriptTest(unittest.TestCase):
             nonlocal thread
             thread = threading.current_thread()
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    _load(test_code, None, inline=False, chdir=None).result()
-                    self.assertIsNot(thread, threading.current_thread())
+        with self.environment.use():
+            _load(test_code, None, inline=False, chdir=None).result()
+            self.assertIsNot(thread, threading.current_thread())
 
     def test_load_runs_inline_by_default(self):
         thread = None
@@ -315,72 +327,42 @@ class ScriptTest(unittest.TestCase):
             nonlocal thread
             thread = threading.current_thread()
 
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    _load(test_code, None, chdir=None).result()
-                    self.assertIs(thread, threading.current_thread())
+        with self.environment.use():
+            _load(test_code, None, chdir=None).result()
+            self.assertIs(thread, threading.current_thread())
 
     def test_code_runs_string(self):
-        CODE = textwrap.dedent("""
-            from vsengine._testutils import BLACKBOARD
-            BLACKBOARD["vpy_test_runs_raw_code_str"] = True
-        """)
-
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    code(CODE).result()
-                    self.assertEqual(BLACKBOARD.get("vpy_test_runs_raw_code_str"), True)
+        with self.environment.use():
+            code(CODE_STR).result()
+            self.assertEqual(BLACKBOARD.get("vpy_test_runs_raw_code_str"), True)
 
     def test_code_runs_bytes(self):
-        CODE = textwrap.dedent("""
-            # encoding: latin-1
-            from vsengine._testutils import BLACKBOARD
-            BLACKBOARD["vpy_test_runs_raw_code_bytes"] = True
-        """).encode("latin-1")
-
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    code(CODE).result()
-                    self.assertEqual(BLACKBOARD.get("vpy_test_runs_raw_code_bytes"), True)
+        with self.environment.use():
+            code(CODE_BYTES).result()
+            self.assertEqual(BLACKBOARD.get("vpy_test_runs_raw_code_bytes"), True)
 
     def test_code_runs_ast(self):
-        CODE = ast.parse(textwrap.dedent("""
-            from vsengine._testutils import BLACKBOARD
-            BLACKBOARD["vpy_test_runs_raw_code_ast"] = True
-        """))
-
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    code(CODE).result()
-                    self.assertEqual(BLACKBOARD.get("vpy_test_runs_raw_code_ast"), True)
+        with self.environment.use():
+            code(CODE_AST).result()
+            self.assertEqual(BLACKBOARD.get("vpy_test_runs_raw_code_ast"), True)
 
     def test_script_runs(self):
         BLACKBOARD.clear()
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    script(PATH).result()
-                    self.assertEqual(BLACKBOARD.get("vpy_run_script"), True)
+        with self.environment.use():
+            script(PATH).result()
+            self.assertEqual(BLACKBOARD.get("vpy_run_script"), True)
 
     def test_script_runs_with_custom_name(self):
         BLACKBOARD.clear()
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    script(PATH, module_name="__test__").result()
-                    self.assertEqual(BLACKBOARD.get("vpy_run_script_name"), "__test__")
+        with self.environment.use():
+            script(PATH, module_name="__test__").result()
+            self.assertEqual(BLACKBOARD.get("vpy_run_script_name"), "__test__")
 
     def test_can_get_and_set_variables(self):
-        with Policy(GlobalStore()) as p:
-            with p.new_environment() as env:
-                with env.use():
-                    script = variables({"a": 1})
-                    script.result()
-                    self.assertEqual(script.get_variable("a").result(), 1)
+        with self.environment.use():
+            script = variables({"a": 1})
+            script.result()
+            self.assertEqual(script.get_variable("a").result(), 1)
 
     def test_wrap_exceptions_wraps_exception(self):
         err = RuntimeError()
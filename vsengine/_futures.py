@@ -3,6 +3,7 @@
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
 import inspect
+import logging
 import functools
 import typing as t
 from concurrent.futures import Future
@@ -10,12 +11,104 @@ from concurrent.futures import Future
 from vsengine.loops import Cancelled, get_loop, keep_environment
 
 
+logger = logging.getLogger(__name__)
+
+
 T = t.TypeVar("T")
 V = t.TypeVar("V")
 
 UnifiedRunner = t.Callable[..., t.Union[Future[T],t.Iterator[Future[T]]]]
 UnifiedCallable = t.Callable[..., t.Union['UnifiedFuture', 'UnifiedIterator']]
 
+# Registers a done-callback without capturing the current environment.
+# Only use this for internal callbacks that do not depend on it.
+_add_raw_done_callback = Future.add_done_callback
+
+# Marks the end of a future iterator.
+# None cannot be used, so iterators that wrongly yield None still fail loudly.
+_END: t.Any = object()
+
+
+# The done-callbacks of then, map and catch.
+# Future.result() reports both outcomes while taking the lock of the
+# future only once, unlike calling exception() and result() in turn.
+class _MapCallback:
+    __slots__ = ("result", "cb")
+
+    def __init__(self, result: Future[t.Any], cb: t.Callable[[t.Any], t.Any]) -> None:
+        self.result = result
+        self.cb = cb
+
+    def __call__(self, future: Future[t.Any]) -> None:
+        try:
+            value = future.result()
+        except BaseException as exc:
+            self.result.set_exception(exc)
+            return
+
+        try:
+            r = self.cb(value)
+        except BaseException as e:
+            self.result.set_exception(e)
+        else:
+            self.result.set_result(r)
+
+
+class _CatchCallback:
+    __slots__ = ("result", "cb")
+
+    def __init__(self, result: Future[t.Any], cb: t.Callable[[BaseException], t.Any]) -> None:
+        self.result = result
+        self.cb = cb
+
+    def __call__(self, future: Future[t.Any]) -> None:
+        try:
+            value = future.result()
+        except BaseException as exc:
+            try:
+                r = self.cb(exc)
+            except BaseException as e:
+                self.result.set_exception(e)
+            else:
+                self.result.set_result(r)
+        else:
+            self.result.set_result(value)
+
+
+class _ThenCallback:
+    __slots__ = ("result", "success_cb", "err_cb")
+
+    def __init__(
+            self,
+            result: Future[t.Any],
+            success_cb: t.Optional[t.Callable[[t.Any], t.Any]],
+            err_cb: t.Optional[t.Callable[[BaseException], t.Any]]
+    ) -> None:
+        self.result = result
+        self.success_cb = success_cb
+        self.err_cb = err_cb
+
+    def __call__(self, future: Future[t.Any]) -> None:
+        try:
+            value = future.result()
+        except BaseException as exc:
+            if self.err_cb is None:
+                self.result.set_exception(exc)
+                return
+            cb, value = self.err_cb, exc
+        else:
+            if self.success_cb is None:
+                self.result.set_result(value)
+                return
+            cb = self.success_cb
+
+        try:
+            r = cb(value)
+        except BaseException as e:
+            self.result.set_exception(e)
+        else:
+            self.result.set_result(r)
+
 
 class UnifiedFuture(Future[T]):
 
@@ -33,13 +126,22 @@ class UnifiedFuture(Future[T]):
         if isinstance(future, cls):
             return future
 
+        # Finished futures can be copied without going through a callback.
+        if future.done() and not future.cancelled():
+            try:
+                return cls.resolve(future.result())
+            except BaseException as e:
+                return cls.reject(e)
+
         result = cls()
         def _receive(_):
-            if (exc := future.exception()) is not None:
-                result.set_exception(exc)
+            try:
+                value = future.result()
+            except BaseException as e:
+                result.set_exception(e)
             else:
-                result.set_result(future.result())
-        future.add_done_callback(_receive)
+                result.set_result(value)
+        _add_raw_done_callback(future, _receive)
         return result
 
     @classmethod
@@ -60,8 +162,10 @@ class UnifiedFuture(Future[T]):
         super().add_done_callback(keep_environment(fn))
 
     def add_loop_callback(self, func: t.Callable[['UnifiedFuture[T]'], None]) -> None:
+        # The callback runs on the loop that was active when it was added.
+        loop = get_loop()
         def _wrapper(future):
-            get_loop().from_thread(func, future)
+            loop.from_thread(func, future)
         self.add_done_callback(_wrapper)
 
     # Manipulating futures
@@ -71,47 +175,34 @@ class UnifiedFuture(Future[T]):
             err_cb: t.Optional[t.Callable[[BaseException], V]]
     ) -> 'UnifiedFuture[V]':
         result = UnifiedFuture()
-        def _run_cb(cb, v):
-            try:
-                r = cb(v)
-            except BaseException as e:
-                result.set_exception(e)
-            else:
-                result.set_result(r)
-
-        def _done(_):
-            if (exc := self.exception()) is not None:
-                if err_cb is not None:
-                    _run_cb(err_cb, exc)
-                else:
-                    result.set_exception(exc)
-            else:
-                if success_cb is not None:
-                    _run_cb(success_cb, self.result())
-                else:
-                    result.set_result(self.result())
-
-        self.add_done_callback(_done)
+        self.add_done_callback(_ThenCallback(result, success_cb, err_cb))
         return result
 
+    # map and catch are used far more often than then,
+    # so they dispatch to their single callback directly.
     def map(self, cb: t.Callable[[T], V]) -> 'UnifiedFuture[V]':
-        return self.then(cb, None)
+        result = UnifiedFuture()
+        self.add_done_callback(_MapCallback(result, cb))
+        return result
 
     def catch(self, cb: t.Callable[[BaseException], V]) -> 'UnifiedFuture[V]':
-        return self.then(None, cb)
+        result = UnifiedFuture()
+        self.add_done_callback(_CatchCallback(result, cb))
+        return result
 
     # Nicer Syntax
+    # Like the with-statement itself, the protocol methods are looked up on the type.
     def __enter__(self):
         obj = self.result()
-        if hasattr(obj, "__enter__"):
-            return t.cast(t.ContextManager[t.Any], obj).__enter__()
+        if (enter := getattr(type(obj), "__enter__", None)) is not None:
+            return enter(obj)
         else:
             raise NotImplementedError("(async) with is not implemented for this object.")
 
     def __exit__(self, exc, val, tb):
         obj = self.result()
-        if hasattr(obj, "__exit__"):
-            return t.cast(t.ContextManager[t.Any], obj).__exit__(exc, val, tb)
+        if (exit := getattr(type(obj), "__exit__", None)) is not None:
+            return exit(obj, exc, val, tb)
         else:
             raise NotImplementedError("(async) with is not implemented for this object.")
 
@@ -123,24 +214,32 @@ class UnifiedFuture(Future[T]):
 
     async def __aenter__(self):
         result = await self.awaitable()
-        if hasattr(result, "__aenter__"):
-            return await t.cast(t.AsyncContextManager[t.Any], result).__aenter__()
-        elif hasattr(result, "__enter__"):
-            return t.cast(t.ContextManager[t.Any], result).__enter__()
+        cls = type(result)
+        if (aenter := getattr(cls, "__aenter__", None)) is not None:
+            return await aenter(result)
+        elif (enter := getattr(cls, "__enter__", None)) is not None:
+            return enter(result)
         else:
             raise NotImplementedError("(async) with is not implemented for this object.")
 
     async def __aexit__(self, exc, val, tb):
         result = await self.awaitable()
-        if hasattr(result, "__aexit__"):
-            return await t.cast(t.AsyncContextManager[t.Any], result).__aexit__(exc, val, tb)
-        elif hasattr(result, "__exit__"):
-            return t.cast(t.ContextManager[t.Any], result).__exit__(exc, val, tb)
+        cls = type(result)
+        if (aexit := getattr(cls, "__aexit__", None)) is not None:
+            return await aexit(result, exc, val, tb)
+        elif (exit := getattr(cls, "__exit__", None)) is not None:
+            return exit(result, exc, val, tb)
         else:
             raise NotImplementedError("(async) with is not implemented for this object.")
 
 
 class UnifiedIterator(t.Generic[T]):
+    __slots__ = ("future_iterable",)
+
+    # How many already finished futures run_as_completed processes
+    # before it passes control back to the event loop.
+    # Subclasses can override it.
+    batch_size: t.ClassVar[int] = 16
 
     def __init__(self, future_iterable: t.Iterator[Future[T]]) -> None:
         self.future_iterable = future_iterable
@@ -156,67 +255,86 @@ class UnifiedIterator(t.Generic[T]):
     def run_as_completed(self, callback: t.Callable[[Future[T]], t.Any]) -> UnifiedFuture[None]:
         state = UnifiedFuture()
 
+        # The iteration stays on the loop that was active when it started.
+        loop = get_loop()
+
+        # The closures below run for every future, so bind everything they use once.
+        iterator = self.future_iterable
+        batch_size = self.batch_size
+        from_thread = loop.from_thread
+        next_cycle = loop.next_cycle
+        state_done = state.done
+        state_cancelled = state.cancelled
+        set_result = state.set_result
+        set_exception = state.set_exception
+
         def _is_done_or_cancelled() -> bool:
-            if state.done():
+            if state_done():
                 return True
-            elif state.cancelled():
-                state.set_exception(Cancelled())
+            elif state_cancelled():
+                set_exception(Cancelled())
                 return True
             else:
                 return False
 
-        def _get_next_future() -> t.Optional[Future[T]]:
+        def _get_next_future() -> Future[T]:
             if _is_done_or_cancelled():
-                return None
+                return _END
 
             try:
-                next_future = self.future_iterable.__next__()
-            except StopIteration:
-                state.set_result(None)
-                return None
+                next_future = next(iterator, _END)
             except BaseException as e:
-                state.set_exception(e)
-                return None
-            else:
-                return next_future
+                set_exception(e)
+                return _END
+
+            if next_future is _END:
+                set_result(None)
+            return next_future
 
         def _run_callbacks():
+            processed = 0
             try:
-                while (future := _get_next_future()) is not None:
+                while (future := _get_next_future()) is not _END:
                     # Wait for the future to finish.
                     if not future.done():
-                        future.add_done_callback(_continuation_in_foreign_thread)
+                        _add_raw_done_callback(future, _continuation_in_foreign_thread)
                         return
 
                     # Run the callback.
                     if not _run_single_callback(future):
                         return
 
+                    # Keep draining futures that are already done until the batch is full.
+                    processed += 1
+                    if processed < batch_size:
+                        continue
+                    processed = 0
+
                     # Try to give control back to the event loop.
-                    next_cycle = get_loop().next_cycle()
-                    if not next_cycle.done():
-                        next_cycle.add_done_callback(_continuation_from_next_cycle)
+                    cycle = next_cycle()
+                    if not cycle.done():
+                        _add_raw_done_callback(cycle, _continuation_from_next_cycle)
                         return
 
                     # We do not have a real event loop here.
                     # If the next_cycle causes an error to bubble, forward it to the state future.
-                    if next_cycle.exception() is not None:
-                        state.set_exception(next_cycle.exception())
+                    if (exc := cycle.exception()) is not None:
+                        set_exception(exc)
                         return
             except Exception as e:
-                import traceback
-                traceback.print_exception(e)
-                state.set_exception(e)
+                # The error is forwarded to the caller through the state future.
+                logger.debug("Iteration failed.", exc_info=e)
+                set_exception(e)
 
         def _continuation_from_next_cycle(fut):
-            if fut.exception() is not None:
-                state.set_exception(fut.exception())
+            if (exc := fut.exception()) is not None:
+                set_exception(exc)
             else:
                 _run_callbacks()
 
         def _continuation_in_foreign_thread(fut: Future[T]):
             # Optimization, see below.
-            get_loop().from_thread(_continuation, fut)
+            from_thread(_continuation, fut)
 
         def _continuation(fut: Future[T]):
             if _run_single_callback(fut):
@@ -232,19 +350,20 @@ class UnifiedIterator(t.Generic[T]):
             try:
                 result = callback(fut)
             except BaseException as e:
-                state.set_exception(e)
+                set_exception(e)
                 return False
-            else:
-                if result is None or bool(result):
-                    return True
-                else:
-                    state.set_result(None)
-                    return False
+
+            # Only an explicit False stops the iteration.
+            # Other return values are not inspected, as their truthiness might be ambiguous.
+            if result is False:
+                set_result(None)
+                return False
+            return True
 
         # Optimization:
         # We do not need to inherit any kind of environment as
         # _run_single_callback will automatically set the environment for us.
-        get_loop().from_thread(_run_callbacks)
+        from_thread(_run_callbacks)
         return state
 
     def __iter__(self):
@@ -258,9 +377,7 @@ class UnifiedIterator(t.Generic[T]):
         return self
 
     async def __anext__(self) -> T:
-        try:
-            fut = self.future_iterable.__next__()
-        except StopIteration:
+        if (fut := next(self.future_iterable, _END)) is _END:
             raise StopAsyncIteration
         return await get_loop().await_future(fut)
 
@@ -270,28 +387,17 @@ def unified(
         future_class: t.Type[UnifiedFuture[T]] = UnifiedFuture,
         iterable_class: t.Type[UnifiedIterator[T]] = UnifiedIterator,
 ) -> t.Callable[[UnifiedRunner[T]], UnifiedCallable]:
-    def _wrap_generator(func: UnifiedRunner[T]) -> UnifiedCallable:
+    def _wrap(func: UnifiedRunner[T], from_call: t.Callable[..., t.Any]) -> UnifiedCallable:
+        # from_call is resolved once when decorating instead of on every call.
         @functools.wraps(func)
         def _wrapped(*args, **kwargs):
-            return iterable_class.from_call(func, *args, **kwargs)
-        return _wrapped
-
-    def _wrap_future(func: UnifiedRunner[T]) -> UnifiedCallable:
-        @functools.wraps(func)
-        def _wrapped(*args, **kwargs):
-            return future_class.from_call(func, *args, **kwargs)
+            return from_call(func, *args, **kwargs)
         return _wrapped
 
     def _wrapper(func: UnifiedRunner[T]) -> UnifiedCallable:
-        if type == "auto":
-            if inspect.isgeneratorfunction(func):
-                return _wrap_generator(func)
-            else:
-                return _wrap_future(func)
-        elif type == "generator":
-            return _wrap_generator(func)
+        if type == "generator" or (type == "auto" and inspect.isgeneratorfunction(func)):
+            return _wrap(func, iterable_class.from_call)
         else:
-            return _wrap_future(func)
+            return _wrap(func, future_class.from_call)
 
     return _wrapper
-
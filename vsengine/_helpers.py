@@ -2,6 +2,7 @@
 # Copyright (C) 2022  cid-chan
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
+import functools
 import contextlib
 import typing as t
 import vapoursynth as vs
@@ -15,9 +16,12 @@ T = t.TypeVar("T")
 EnvironmentTypes = t.Union[vs.Environment, ManagedEnvironment]
 
 
+# Reusable no-op context for the common case where an environment is already active.
+_NO_CONTEXT = contextlib.nullcontext()
+
+
 # Automatically set the environment within that block.
-@contextlib.contextmanager
-def use_inline(function_name: str, env: t.Optional[EnvironmentTypes]) -> t.Generator[None, None, None]:
+def use_inline(function_name: str, env: t.Optional[EnvironmentTypes]) -> t.ContextManager[None]:
     if env is None:
         # Ensure there is actually an environment set in this block.
         try:
@@ -27,15 +31,13 @@ def use_inline(function_name: str, env: t.Optional[EnvironmentTypes]) -> t.Gener
                 f"You are currently not running within an environment. "
                 f"Pass the environment directly to {function_name}."
             ) from e
-        yield
+        return _NO_CONTEXT
 
     elif isinstance(env, ManagedEnvironment):
-        with env.inline_section():
-            yield
+        return env.inline_section()
 
     else:
-        with env.use():
-            yield
+        return env.use()
 
 
 # Variable size and format clips may require different handling depending on the actual frame size.
@@ -49,31 +51,19 @@ def wrap_variable_size(
     if node.format is not None and node.width != 0 and node.height != 0:
         return func(node)
 
-    def _do_resize(f: vs.VideoFrame) -> vs.VideoNode:
+    # Resolve the plugin function once instead of on every frame.
+    resize_point = node.resize.Point
+
+    # The format is passed by its ID so the cache is keyed by plain integers.
+    # Unlike a fixed cap, the LRU keeps caching the most recent formats.
+    @functools.lru_cache(maxsize=128)
+    def _do_resize(format_id: int, width: int, height: int) -> vs.VideoNode:
         # Resize the node to make them assume a specific format.
         # As the node should aready have this format, this should be a no-op.
-        return func(node.resize.Point(format=f.format, width=f.width, height=f.height))
+        return func(resize_point(format=format_id, width=width, height=height))
 
-    _node_cache = {}
     def _assume_format(n: int, f: vs.VideoFrame) -> vs.VideoNode:
-        nonlocal _node_cache
-        selector = (int(f.format), f.width, f.height)
-
-        if _node_cache is None or len(_node_cache) > 100:
-            # Skip caching if the cahce grows too large.
-            _node_cache = None
-            wrapped = _do_resize(f)
-
-        elif selector not in _node_cache:
-            # Resize and cache the node.
-            wrapped = _do_resize(f)
-            _node_cache[selector] = wrapped
-
-        else:
-            # Use the cached node.
-            wrapped = _node_cache[selector]
-
-        return wrapped
+        return _do_resize(int(f.format), f.width, f.height)
 
     # This clip must not become part of the closure,
     # or otherwise we risk cyclic references.
@@ -14,7 +14,6 @@ logger = logging.getLogger(__name__)
 
 lock = threading.Lock()
 refctr = 0
-refnanny = {}
 cores = {}
 
 stage2_to_add = set()
@@ -31,9 +30,10 @@ def admit_environment(environment: EnvironmentData, core: Core):
         ident = refctr
         refctr+=1
 
-    ref = weakref.ref(environment, lambda _: _add_tostage1(ident))
     cores[ident] = core
-    refnanny[ident] = ref
+    # The finalizer keeps itself alive until the environment dies.
+    # Don't run it on interpreter shutdown.
+    weakref.finalize(environment, _add_tostage1, ident).atexit = False
 
     logger.info(f"Admitted environment {environment!r} and {core!r} as with ID:{ident}.")
 
@@ -62,40 +62,27 @@ def unfreeze():
     hold.clear()
 
 
-def _is_core_still_used(ident: int) -> bool:
-    return sys.getrefcount(cores[ident]) > 2
-
-
 def _add_tostage1(ident: int) -> None:
     logger.info(f"Environment has died. Keeping core for a few gc-cycles. ID:{ident}")
     with lock:
         stage1.add(ident)
 
 
-def _collectstage1(phase, __):
-    if phase != "stop":
-        return
-
-    with lock:
-        for ident in tuple(stage1):
-            if _is_core_still_used(ident):
-                logger.warning(f"Core is still in use. ID:{ident}")
-                continue
-
-            stage1.remove(ident)
-            stage2_to_add.add(ident)
-
-
-def _collectstage2(phase, __):
+def _collect(phase, __):
     global stage2_to_add
 
     if phase != "stop":
         return
 
+    # A core that is only referenced by the cores-dict (and the argument
+    # to getrefcount) is not used anymore.
+    getrefcount = sys.getrefcount
+
     garbage = []
     with lock:
+        # Stage 2: Release the cores that survived a full cycle.
         for ident in tuple(stage2):
-            if _is_core_still_used(ident):
+            if getrefcount(cores[ident]) > 2:
                 logger.warn(f"Core is still in use in stage 2. ID:{ident}")
                 continue
 
@@ -106,9 +93,17 @@ def _collectstage2(phase, __):
         stage2.update(stage2_to_add)
         stage2_to_add = set()
 
-    garbage.clear()
+        # Stage 1: Queue the cores of dead environments for stage 2.
+        #          They only enter stage 2 on the next cycle.
+        for ident in tuple(stage1):
+            if getrefcount(cores[ident]) > 2:
+                logger.warning(f"Core is still in use. ID:{ident}")
+                continue
 
+            stage1.remove(ident)
+            stage2_to_add.add(ident)
+
+    garbage.clear()
 
-gc.callbacks.append(_collectstage2)
-gc.callbacks.append(_collectstage1)
 
+gc.callbacks.append(_collect)
@@ -4,7 +4,8 @@
 # SPDX-License-Identifier: EUPL-1.2
 import typing as t
 from concurrent.futures import Future
-from threading import RLock
+from itertools import islice
+from threading import Lock, Condition
 from vapoursynth import core
 
 
@@ -20,65 +21,103 @@ def buffer_futures(futures: t.Iterable[Future[T_co]], prefetch: int=0, backlog:
     if backlog < prefetch:
         backlog = prefetch
 
-    enum_fut = enumerate(futures)
+    futures_iter = iter(futures)
 
     finished = False
     running = 0
-    lock = RLock()
-    reorder: t.MutableMapping[int, Future[T_co]] = {}
-
-    def _request_next():
-        nonlocal finished, running
-        with lock:
-            if finished:
-                return
-
-            ni = next(enum_fut, None)
-            if ni is None:
-                finished = True
-                return
-
-            running += 1
-
-            idx, fut = ni
-            reorder[idx] = fut
-            fut.add_done_callback(_finished)
+    lock = Lock()
+    pull_lock = Lock()
+    # Notified whenever a future is requested or completes.
+    changed = Condition(lock)
+    # Requested futures are always contiguous and never more than backlog,
+    # so they fit into a fixed ring indexed by their position.
+    ring: t.List[t.Optional[Future[T_co]]] = [None] * backlog
+    pending = 0
+    # The index of the next future pulled from the iterator.
+    next_idx = 0
 
     def _finished(f):
         nonlocal finished, running
         with lock:
             running -= 1
+            changed.notify_all()
             if finished:
                 return
 
-            if f.exception() is not None:
+            if f.cancelled() or f.exception() is not None:
                 finished = True
                 return
-            
-            _refill()
+
+        _refill()
 
     def _refill():
-        if finished:
-            return
+        nonlocal finished, running, pending, next_idx
+        while not finished:
+            # Only one thread may advance the iterator at a time.
+            # The buffer lock is not held while doing so, so completing frames are not blocked.
+            with pull_lock:
+                with lock:
+                    if finished:
+                        return
+                    # Two rules: 1. Don't exceed the concurrency barrier.
+                    #            2. Don't exceed unused-frames-backlog
+                    count = min(prefetch - running, backlog - pending)
+
+                if count <= 0:
+                    return
+
+                requested = list(islice(futures_iter, count))
+                with lock:
+                    if len(requested) < count:
+                        finished = True
+                    for fut in requested:
+                        ring[next_idx % backlog] = fut
+                        next_idx += 1
+                    running += len(requested)
+                    pending += len(requested)
+                    changed.notify_all()
+
+            # Futures that are already done are settled right here.
+            # A callback would run immediately and refill recursively.
+            settled = 0
+            failed = False
+            for fut in requested:
+                if not fut.done():
+                    fut.add_done_callback(_finished)
+                    continue
+
+                settled += 1
+                if fut.cancelled() or fut.exception() is not None:
+                    failed = True
+
+            if settled == 0:
+                return
+
+            with lock:
+                running -= settled
+                if failed:
+                    finished = True
+                changed.notify_all()
 
-        with lock:
-            # Two rules: 1. Don't exceed the concurrency barrier.
-            #            2. Don't exceed unused-frames-backlog
-            while (not finished) and (running < prefetch) and len(reorder)<backlog:
-                _request_next()
     _refill()
 
     sidx = 0
     fut: Future[T_co]
     try:
-        while (not finished) or (len(reorder)>0) or running>0:
-            if sidx not in reorder:
-                # Spin. Reorder being empty should never happen.
-                continue
-
-            # Get next requested frame
-            fut = reorder[sidx]
-            del reorder[sidx]
+        while True:
+            with lock:
+                # Block until the next frame has been requested.
+                # The ring being empty only happens after we stopped requesting frames.
+                slot = sidx % backlog
+                while ring[slot] is None:
+                    if finished and running == 0:
+                        return
+                    changed.wait()
+
+                # Get next requested frame
+                fut = ring[slot]
+                ring[slot] = None
+                pending -= 1
             sidx += 1
             _refill()
 
@@ -88,6 +127,16 @@ def buffer_futures(futures: t.Iterable[Future[T_co]], prefetch: int=0, backlog:
         finished = True
 
 
+def _close_when_done(fut: Future[t.ContextManager[t.Any]]) -> None:
+    # Runs after the callback that entered the context manager.
+    # Read the future only once, failed futures were never entered.
+    try:
+        cm = fut.result()
+    except BaseException:
+        return
+    cm.__exit__(None, None, None)
+
+
 def close_when_needed(future_iterable: t.Iterable[Future[t.ContextManager[T]]]) -> t.Iterable[Future[T]]:
     def copy_future_and_run_cb_before(fut):
         f = Future()
@@ -103,12 +152,7 @@ def close_when_needed(future_iterable: t.Iterable[Future[t.ContextManager[T]]])
         fut.add_done_callback(_as_completed)
         return f
 
-    def close_fut(f: Future[t.ContextManager[T]]):
-        def _do_close(_):
-            if f.exception() is None:
-                f.result().__exit__(None, None, None)
-        f.add_done_callback(_do_close)
-
     for fut in future_iterable:
         yield copy_future_and_run_cb_before(fut)
-        close_fut(fut)
+        # Only close once the consumer asked for the next frame.
+        fut.add_done_callback(_close_when_done)
@@ -14,6 +14,8 @@ and monkey-patching vapoursynth.register_policy.
 This policy is transparent to subsequent policies registering themselves.
 
 To unregister a policy, run forcefully_unregister_policy.
+It returns immediately when no policy has been registered since the last
+call, so it is cheap to call in setUp and tearDown.
 
 As an addition,
 it prevents VapourSynth from creating a vapoursynth.StandalonePolicy.
@@ -25,6 +27,7 @@ This function will build a policy which only ever uses one environment.
 """
 
 import typing as t
+import subprocess
 
 from vsengine._hospice import admit_environment
 
@@ -41,7 +44,9 @@ __all__ = [
 
     "BLACKBOARD",
 
-    "wrap_test_for_asyncio"
+    "wrap_test_for_asyncio",
+
+    "FixtureProcesses"
 ]
 
 
@@ -50,6 +55,8 @@ BLACKBOARD = {}
 
 class ProxyPolicy(EnvironmentPolicy):
     _api: t.Optional[EnvironmentPolicyAPI]
+    # The policy currently attached to the proxy.
+    # Unregistering uses this handle directly instead of searching for it.
     _policy: t.Optional[EnvironmentPolicy]
 
     __slots__ = ("_api", "_policy")
@@ -73,6 +80,7 @@ class ProxyPolicy(EnvironmentPolicy):
             raise
 
     def forcefully_unregister_policy(self):
+        # Nothing has been registered since the last cleanup.
         if self._policy is None:
             return
         if self._api is None:
@@ -155,13 +163,19 @@ class EnvironmentPolicyAPIWrapper:
     _api: EnvironmentPolicyAPI
     _proxy: ProxyPolicy
 
-    __slots__ = ("_api", "_proxy")
+    # The functions policies call all the time are bound directly.
+    _FORWARDED = ("create_environment", "wrap_environment", "destroy_environment")
+
+    __slots__ = ("_api", "_proxy", *_FORWARDED)
 
     def __init__(self, api, proxy) -> None:
         self._api = api
         self._proxy = proxy
+        for name in self._FORWARDED:
+            setattr(self, name, getattr(api, name))
 
     def __getattr__(self, __name: str) -> t.Any:
+        # Only reached for the rest of the API.
         return getattr(self._api, __name)
 
     def unregister_policy(self):
@@ -186,5 +200,41 @@ def wrap_test_for_asyncio(func):
         async def _run():
             set_loop(AsyncIOLoop())
             await func(self)
-        asyncio.run(_run())
+
+        # Test cases can share one event loop by providing an asyncio.Runner.
+        runner = getattr(self, "asyncio_runner", None)
+        if runner is None:
+            asyncio.run(_run())
+        else:
+            runner.run(_run())
     return test_case
+
+
+class FixtureProcesses:
+    """
+    Starts fixture processes at once so their interpreters start up concurrently.
+
+    Use it in setUpClass and call close in tearDownClass.
+    """
+    processes: t.Dict[str, subprocess.Popen]
+
+    __slots__ = ("processes",)
+
+    def __init__(
+            self,
+            start: t.Callable[[str], subprocess.Popen],
+            fixtures: t.Iterable[str]
+    ) -> None:
+        self.processes = {fixture: start(fixture) for fixture in fixtures}
+
+    def __getitem__(self, fixture: str) -> subprocess.Popen:
+        return self.processes[fixture]
+
+    def close(self) -> None:
+        # Clean up fixtures whose tests did not run.
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.kill()
+                process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
@@ -5,32 +5,81 @@
 
 import typing as t
 import asyncio
-import contextlib
+import threading
+import collections
+import functools
 import contextvars
-from concurrent.futures import Future
+from concurrent.futures import Future, Executor
 
-from vsengine.loops import EventLoop, Cancelled
+from vsengine.loops import EventLoop, Cancelled, _WrapCancelled
 
 
 T = t.TypeVar("T")
 
 
+_WRAP_CANCELLED = _WrapCancelled(asyncio.CancelledError)
+
+
+def _finish_cycle(future: Future[None], task: t.Optional[asyncio.Task]) -> None:
+    if task is None or not task.cancelled():
+        future.set_result(None)
+    else:
+        future.set_exception(Cancelled())
+
+
 class AsyncIOLoop(EventLoop):
     """
     Bridges vs-engine to AsyncIO.
+
+    Any asyncio-compatible event-loop works, including uvloop.
+    Install it with the "uvloop" extra and run your application
+    on it (e.g. with uvloop.run or uvloop.install) for lower
+    scheduling overhead.
     """
     loop: asyncio.AbstractEventLoop
+    executor: t.Optional[Executor]
+
+    # The thread the event-loop runs on while attached.
+    _thread: t.Optional[int]
 
-    def __init__(self, loop: t.Optional[asyncio.AbstractEventLoop] = None) -> None:
+    # Functions submitted by from_thread that still have to run on the loop.
+    _pending: t.Deque[t.Tuple[Future[t.Any], t.Callable[[], None]]]
+    _drain_lock: threading.Lock
+    _drain_scheduled: bool
+
+    def __init__(
+            self,
+            loop: t.Optional[asyncio.AbstractEventLoop] = None,
+            executor: t.Optional[Executor] = None
+    ) -> None:
+        """
+        :param loop: The event-loop to bridge to. Defaults to the current event-loop.
+        :param executor: The executor to_thread runs its functions in.
+                         Defaults to the default executor of the event-loop.
+        """
         if loop is None:
             loop = asyncio.get_event_loop()
         self.loop = loop
+        self.executor = executor
+        self._thread = None
+
+        self._pending = collections.deque()
+        self._drain_lock = threading.Lock()
+        self._drain_scheduled = False
 
     def attach(self):
-        pass
+        """
+        Called when set_loop is run.
+
+        Must be called from the thread the event-loop runs on.
+        """
+        self._thread = threading.get_ident()
 
     def detach(self):
-        pass
+        """
+        Called when another event-loop should take over.
+        """
+        self._thread = None
 
     def from_thread(
             self,
@@ -40,6 +89,17 @@ class AsyncIOLoop(EventLoop):
     ) -> Future[T]:
         future = Future()
 
+        # Already on the loop: Run it right away,
+        # unless that would overtake functions other threads submitted before.
+        if threading.get_ident() == self._thread and not self._pending:
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            return future
+
         ctx = contextvars.copy_context()
         def _wrap():
             if not future.set_running_or_notify_cancel():
@@ -52,35 +112,101 @@ class AsyncIOLoop(EventLoop):
             else:
                 future.set_result(result)
 
-        self.loop.call_soon_threadsafe(_wrap)
+        self._pending.append((future, _wrap))
+        with self._drain_lock:
+            if self._drain_scheduled:
+                return future
+            self._drain_scheduled = True
+
+        # Only wake up the loop once for all functions submitted until it drains them.
+        try:
+            self.loop.call_soon_threadsafe(self._drain)
+        except BaseException as e:
+            # Nothing will drain the queue, so fail everything that is still waiting in it.
+            # This includes functions other threads queued in the meantime.
+            with self._drain_lock:
+                self._drain_scheduled = False
+                failed = list(self._pending)
+                self._pending.clear()
+            for queued, _ in failed:
+                if queued.set_running_or_notify_cancel():
+                    queued.set_exception(e)
+            raise
         return future
 
+    def _drain(self) -> None:
+        pending = self._pending
+
+        # Only run what has been submitted so far,
+        # so busy threads cannot starve the loop.
+        for _ in range(len(pending)):
+            pending.popleft()[1]()
+
+        with self._drain_lock:
+            if not pending:
+                self._drain_scheduled = False
+                return
+
+        self.loop.call_soon(self._drain)
+
     def to_thread(self, func, *args, **kwargs):
+        # asyncio.to_thread can't replace this: It always uses the default executor
+        # of the running loop and only starts the function once it is awaited.
         ctx = contextvars.copy_context()
-        def _wrap():
-            return ctx.run(func, *args, **kwargs)
+        if not kwargs:
+            # run_in_executor forwards positional arguments by itself.
+            return self.loop.run_in_executor(self.executor, ctx.run, func, *args)
 
-        return asyncio.to_thread(_wrap)
+        return self.loop.run_in_executor(
+            self.executor,
+            functools.partial(ctx.run, func, *args, **kwargs)
+        )
 
     async def await_future(self, future: Future[T]) -> T:
         with self.wrap_cancelled():
-            return await asyncio.wrap_future(future, loop=self.loop)
+            # wrap_future would copy the outcome of a finished future
+            # with a round-trip through call_soon_threadsafe.
+            # Cancelled futures go through the bridge, so they raise asyncio.CancelledError.
+            if future.done() and not future.cancelled():
+                return future.result()
+            return await self._bridge_future(future)
+
+    async def _bridge_future(self, future: Future[T]) -> T:
+        # Unlike wrap_future, futures resolved on the loop thread
+        # are copied right away instead of through call_soon_threadsafe.
+        loop = self.loop
+        loop_thread = threading.get_ident()
+        waiter = loop.create_future()
+
+        def _transfer() -> None:
+            if waiter.cancelled():
+                return
+            if future.cancelled():
+                waiter.cancel()
+            elif (exc := future.exception()) is not None:
+                waiter.set_exception(exc)
+            else:
+                waiter.set_result(future.result())
+
+        def _when_done(_) -> None:
+            if threading.get_ident() == loop_thread:
+                _transfer()
+            else:
+                loop.call_soon_threadsafe(_transfer)
+
+        future.add_done_callback(_when_done)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            # Like wrap_future, forward the cancellation to the future.
+            future.cancel()
+            raise
 
     def next_cycle(self) -> Future[None]:
         future = Future()
-        task = asyncio.current_task()
-        def continuation():
-            if task is None or not task.cancelled():
-                future.set_result(None)
-            else:
-                future.set_exception(Cancelled())
-        self.loop.call_soon(continuation)
+        self.loop.call_soon(_finish_cycle, future, asyncio.current_task())
         return future
 
-    @contextlib.contextmanager
-    def wrap_cancelled(self):
-        try:
-            yield
-        except Cancelled:
-            raise asyncio.CancelledError() from None
+    def wrap_cancelled(self) -> t.ContextManager[None]:
+        return _WRAP_CANCELLED
 
@@ -5,22 +5,28 @@
 
 from concurrent.futures import Future
 import typing as t
-import contextlib
+import functools
+import threading
 
+import outcome
 from trio import Cancelled as TrioCancelled
 from trio import CapacityLimiter
 from trio import CancelScope
 from trio import Nursery
 from trio import to_thread
-from trio import Event
-from trio.lowlevel import current_trio_token
+from trio.lowlevel import current_trio_token, current_task
+from trio.lowlevel import reschedule, wait_task_rescheduled, Abort
 
-from vsengine.loops import Cancelled, EventLoop
+from vsengine.loops import Cancelled, EventLoop, _WrapCancelled
 
 
 T = t.TypeVar("T")
 
 
+# Trio does not allow creating Cancelled through its constructor.
+_WRAP_CANCELLED = _WrapCancelled(lambda: TrioCancelled.__new__(TrioCancelled))
+
+
 class TrioEventLoop(EventLoop):
     _scope: Nursery
 
@@ -35,17 +41,20 @@ class TrioEventLoop(EventLoop):
         self.nursery = nursery
         self.limiter = limiter
         self._token = None
+        self._thread = None
 
     def attach(self) -> None:
         """
         Called when set_loop is run.
         """
         self._token = current_trio_token()
+        self._thread = threading.get_ident()
 
     def detach(self) -> None:
         """
         Called when another event-loop should take over.
         """
+        self._thread = None
         self.nursery.cancel_scope.cancel()
 
     def from_thread(
@@ -60,6 +69,17 @@ class TrioEventLoop(EventLoop):
         assert self._token is not None
 
         fut = Future()
+
+        # Already on the trio thread: Run it right away.
+        if threading.get_ident() == self._thread:
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                fut.set_exception(e)
+            else:
+                fut.set_result(result)
+            return fut
+
         def _executor():
             if not fut.set_running_or_notify_cancel():
                 return
@@ -78,21 +98,10 @@ class TrioEventLoop(EventLoop):
         """
         Run this function in a worker thread.
         """
-        result = None
-        error: BaseException|None = None
-        def _executor():
-            nonlocal result, error
-            try:
-                result = func(*args, **kwargs)
-            except BaseException as e:
-                error = e
-
-        await to_thread.run_sync(_executor, limiter=self.limiter)
-        if error is not None:
-            assert isinstance(error, BaseException)
-            raise t.cast(BaseException, error)
-        else:
-            return result
+        return await to_thread.run_sync(
+            functools.partial(func, *args, **kwargs),
+            limiter=self.limiter
+        )
 
     def next_cycle(self) -> Future[None]:
         scope = CancelScope()
@@ -102,7 +111,9 @@ class TrioEventLoop(EventLoop):
                 future.set_exception(Cancelled())
             else:
                 future.set_result(None)
-        self.from_thread(continuation)
+        # from_thread would run this inline on the trio thread.
+        assert self._token is not None
+        self._token.run_sync_soon(continuation)
         return future
 
     async def await_future(self, future: Future[T]) -> T:
@@ -112,36 +123,29 @@ class TrioEventLoop(EventLoop):
         This function does not need to be implemented if the event-loop
         does not support async and await.
         """
-        event = Event()
+        task = current_task()
+        token = current_trio_token()
+        aborted = False
+
+        def _resume(result: outcome.Outcome) -> None:
+            # Runs on the trio thread, so it cannot race with _abort.
+            if not aborted:
+                reschedule(task, result)
 
-        result: T|None = None
-        error: BaseException|None = None
         def _when_done(_):
-            nonlocal error, result
-            if (error := future.exception()) is not None:
-                pass
-            else:
-                result = future.result()
-            self.from_thread(event.set)
+            token.run_sync_soon(_resume, outcome.capture(future.result))
+
+        def _abort(_) -> Abort:
+            nonlocal aborted
+            aborted = True
+            return Abort.SUCCEEDED
 
         future.add_done_callback(_when_done)
-        try:
-            await event.wait()
-        except TrioCancelled:
-            raise
-
-        if error is not None:
-            with self.wrap_cancelled():
-                raise t.cast(BaseException, error)
-        else:
-            return t.cast(T, result)
-
-    @contextlib.contextmanager
-    def wrap_cancelled(self):
+        with self.wrap_cancelled():
+            return await wait_task_rescheduled(_abort)
+
+    def wrap_cancelled(self) -> t.ContextManager[None]:
         """
         Wraps vsengine.loops.Cancelled into the native cancellation error.
         """
-        try:
-            yield
-        except Cancelled:
-            raise TrioCancelled.__new__(TrioCancelled) from None
+        return _WRAP_CANCELLED
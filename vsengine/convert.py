@@ -2,8 +2,8 @@
 # Copyright (C) 2022  cid-chan
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
-import functools
 import typing as t
+from types import MappingProxyType
 import vapoursynth as vs
 
 from vsengine._helpers import use_inline, wrap_variable_size, EnvironmentTypes
@@ -11,112 +11,132 @@ from vsengine._helpers import use_inline, wrap_variable_size, EnvironmentTypes
 
 # The heuristics code for nodes.
 # Usually the nodes are tagged so this heuristics code is not required.
-@functools.lru_cache
-def yuv_heuristic(width: int, height: int) -> t.Mapping[str, str]:
-    result = {}
+#
+# The heuristic only distinguishes four kinds of clips,
+# so the results are built once and shared.
+_UHD_HEURISTIC: t.Mapping[str, str] = MappingProxyType({
+    "matrix_in_s": "2020ncl",
+    "transfer_in_s": "st2084",
+    "primaries_in_s": "2020",
+    "range_in_s": "limited",
+    # ITU-T H.273 (07/2021), Note at the bottom of pg. 20
+    "chromaloc_in_s": "top_left",
+})
+_HD_HEURISTIC: t.Mapping[str, str] = MappingProxyType({
+    "matrix_in_s": "709",
+    "transfer_in_s": "709",
+    "primaries_in_s": "709",
+    "range_in_s": "limited",
+    "chromaloc_in_s": "left",
+})
+_PAL_HEURISTIC: t.Mapping[str, str] = MappingProxyType({
+    "matrix_in_s": "470bg",
+    "transfer_in_s": "470bg",
+    "primaries_in_s": "470bg",
+    "range_in_s": "limited",
+    "chromaloc_in_s": "left",
+})
+_SD_HEURISTIC: t.Mapping[str, str] = MappingProxyType({
+    "matrix_in_s": "170m",
+    "transfer_in_s": "601",
+    "primaries_in_s": "170m",
+    "range_in_s": "limited",
+    "chromaloc_in_s": "left",
+})
 
-    if width >= 3840:
-        result["matrix_in_s"] = "2020ncl"
-    elif width >= 1280:
-        result["matrix_in_s"] = "709"
-    elif height == 576:
-        result["matrix_in_s"] = "470bg"
-    else:
-        result["matrix_in_s"] = "170m"
-
-    if width >= 3840:
-        result["transfer_in_s"] = "st2084"
-    elif width >= 1280:
-        result["transfer_in_s"] = "709"
-    elif height == 576:
-        result["transfer_in_s"] = "470bg"
-    else:
-        result["transfer_in_s"] = "601"
 
+def yuv_heuristic(width: int, height: int) -> t.Mapping[str, str]:
     if width >= 3840:
-        result["primaries_in_s"] = "2020"
+        return _UHD_HEURISTIC
     elif width >= 1280:
-        result["primaries_in_s"] = "709"
+        return _HD_HEURISTIC
     elif height == 576:
-        result["primaries_in_s"] = "470bg"
+        return _PAL_HEURISTIC
     else:
-        result["primaries_in_s"] = "170m"
-
-    result["range_in_s"] = "limited"
+        return _SD_HEURISTIC
+
+
+# A class instead of a closure to avoid capturing clip.
+class _ResizePlan:
+    core: vs.Core
+    real_rgb24: vs.VideoFormat
+    target_rgb: vs.VideoFormat
+    default_args: t.Dict[str, t.Any]
+    scaler: t.Union[str, t.Callable[..., vs.VideoNode]]
+
+    __slots__ = ("core", "real_rgb24", "target_rgb", "default_args", "scaler")
+
+    def __init__(
+            self,
+            core: vs.Core,
+            real_rgb24: vs.VideoFormat,
+            target_rgb: vs.VideoFormat,
+            default_args: t.Dict[str, t.Any],
+            scaler: t.Union[str, t.Callable[..., vs.VideoNode]]
+    ) -> None:
+        self.core = core
+        self.real_rgb24 = real_rgb24
+        self.target_rgb = target_rgb
+        self.default_args = default_args
+        self.scaler = scaler
+
+    def convert_yuv(self, c: vs.VideoNode, fmt: vs.VideoFormat) -> vs.VideoNode:
+        # We make yuv_heuristic not configurable so the heuristic
+        # will be shared across projects.
+        #
+        # In my opinion, this is a quirk that should be shared.
+
+        args = {
+            **yuv_heuristic(c.width, c.height),
+            **self.default_args
+        }
+
+        if fmt.subsampling_w != 0 or fmt.subsampling_h != 0:
+            # To be clear, scaler should always be a string.
+            # Being able to provide a callable just makes testing args easier.
+            #
+            # It is resolved here so an unused scaler is never looked up.
+            resizer = self.scaler
+            if isinstance(resizer, str):
+                resizer = getattr(self.core.resize, resizer)
+        else:
+            # In this case we only do cs transforms, point resize is more then enough.
+            resizer = self.core.resize.Point
+
+        # Keep bitdepth so we can dither futher down in the RGB part.
+        return resizer(
+            c,
+            format=self.real_rgb24.replace(
+                sample_type=fmt.sample_type,
+                bits_per_sample=fmt.bits_per_sample
+            ),
+            **args
+        )
 
-    # ITU-T H.273 (07/2021), Note at the bottom of pg. 20
-    if width >= 3840:
-        result["chromaloc_in_s"] = "top_left"
-    else:
-        result["chromaloc_in_s"] = "left"
+    def __call__(self, c: vs.VideoNode) -> vs.VideoNode:
+        # Every access to c.format creates a new VideoFormat object.
+        fmt = c.format
 
-    return result
+        # Converting to YUV is a little bit more complicated,
+        # so I extracted it to its own function.
+        if fmt.color_family == vs.YUV:
+            c = self.convert_yuv(c, fmt)
+            fmt = c.format
 
+        # Defaulting prefer_props to True makes resizing choke
+        # on GRAY clips.
+        if fmt == vs.GRAY:
+            c = c.std.RemoveFrameProps("_Matrix")
 
-# Move this function out of the closure to avoid capturing clip.
-def _convert_yuv(
-        c: vs.VideoNode,
-        *,
-        core: vs.Core,
-        real_rgb24: vs.VideoFormat,
-        default_args: t.Dict[str, t.Any],
-        scaler: t.Union[str, t.Callable[..., vs.VideoNode]]
-):
-    # We make yuv_heuristic not configurable so the heuristic
-    # will be shared across projects.
-    #
-    # In my opinion, this is a quirk that should be shared.
-
-    args = {
-        **yuv_heuristic(c.width, c.height),
-        **default_args
-    }
-
-    if c.format.subsampling_w != 0 or c.format.subsampling_h != 0:
-        # To be clear, scaler should always be a string.
-        # Being able to provide a callable just makes testing args easier.
-        resizer = getattr(core.resize, scaler) if isinstance(scaler, str) else scaler
-    else:
-        # In this case we only do cs transforms, point resize is more then enough.
-        resizer = core.resize.Point
-
-    # Keep bitdepth so we can dither futher down in the RGB part.
-    return resizer(
-        c,
-        format=real_rgb24.replace(
-            sample_type=c.format.sample_type,
-            bits_per_sample=c.format.bits_per_sample
-        ),
-        **args
-    )
-
-
-# Move this function out of the closure to avoid capturing clip.
-def _actually_resize(
-        c: vs.VideoNode,
-        *,
-        core: vs.Core,
-        convert_yuv: t.Callable[[vs.VideoNode], vs.VideoNode],
-        target_rgb: vs.VideoFormat
-) -> vs.VideoNode:
-    # Converting to YUV is a little bit more complicated,
-    # so I extracted it to its own function.
-    if c.format.color_family == vs.YUV:
-        c = convert_yuv(c)
-
-    # Defaulting prefer_props to True makes resizing choke
-    # on GRAY clips.
-    if c.format == vs.GRAY:
-        c = c.std.RemoveFrameProps("_Matrix")
-
-    # Actually perform the format conversion on a non-subsampled clip.
-    if c.format.color_family != vs.RGB or c.format.sample_type != vs.INTEGER or c.format.bits_per_sample != target_rgb.bits_per_sample:
-        c = core.resize.Point(
-            c,
-            format=target_rgb
-        )
+        # Actually perform the format conversion on a non-subsampled clip.
+        target_rgb = self.target_rgb
+        if fmt.color_family != vs.RGB or fmt.sample_type != vs.INTEGER or fmt.bits_per_sample != target_rgb.bits_per_sample:
+            c = self.core.resize.Point(
+                c,
+                format=target_rgb
+            )
 
-    return c
+        return c
 
 
 def to_rgb(
@@ -141,6 +161,7 @@ def to_rgb(
     :param env: The environment the clip belongs to. (Optional if you don't use EnvironmentPolicies)
     :param bits_per_sample: The bits per sample the resulting RGB clip should have.
     :param scaler: The name scaler function in core.resize that should be used to convert YUV to RGB.
+                   It is only looked up for subsampled YUV clips, the only ones that use it.
     :param default_*: Manually override the defaults predicted by the heuristics.
     :param yuv_heuristic: The heuristic function that takes the frame size and returns a set of yuv-metadata. (For test purposes)
     """
@@ -161,29 +182,22 @@ def to_rgb(
         default_args["chromaloc_in_s"] = default_chromaloc
 
     with use_inline("to_rgb", env):
+        # Clips that already have the target format don't need to be converted.
+        fmt = clip.format
+        if (
+                fmt is not None
+                and fmt.color_family == vs.RGB
+                and fmt.sample_type == vs.INTEGER
+                and fmt.bits_per_sample == bits_per_sample
+        ):
+            return clip
+
         core = vs.core.core
         real_rgb24 = core.get_video_format(vs.RGB24)
         target_rgb = real_rgb24.replace(bits_per_sample=bits_per_sample)
 
-        # This avoids capturing `clip` in a closure creating a self-reference. 
-        convert_yuv = functools.partial(
-            _convert_yuv,
-            core=core,
-            real_rgb24=real_rgb24,
-            default_args=default_args,
-            scaler=scaler
-        )
-
-        actually_resize = functools.partial(
-            _actually_resize,
-            core=core,
-            target_rgb=target_rgb,
-            convert_yuv=convert_yuv
-        )
-
         return wrap_variable_size(
             clip,
             force_assumed_format=target_rgb,
-            func=actually_resize
+            func=_ResizePlan(core, real_rgb24, target_rgb, default_args, scaler)
         )
-
@@ -2,9 +2,12 @@
 # Copyright (C) 2022  cid-chan
 # This project is licensed under the EUPL-1.2
 # SPDX-License-Identifier: EUPL-1.2
-from concurrent.futures import Future, CancelledError
+from concurrent.futures import Future, CancelledError, Executor, ThreadPoolExecutor
 import contextlib
+import threading
 import functools
+import atexit
+import sys
 import typing as t
 
 import vapoursynth
@@ -24,21 +27,66 @@ __all__ = [
 class Cancelled(Exception): pass
 
 
-@contextlib.contextmanager
-def _noop():
-    yield
+_noop = contextlib.nullcontext
+
+
+class _WrapCancelled:
+    """
+    Reusable context manager that turns Cancelled into the native cancellation error.
+    """
+    error: t.Callable[[], BaseException]
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: t.Callable[[], BaseException]) -> None:
+        self.error = error
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None and issubclass(exc_type, Cancelled):
+            raise self.error() from None
+        return False
+
+
+_WRAP_CANCELLED = _WrapCancelled(CancelledError)
 
 
 DONE = Future()
 DONE.set_result(None)
 
 
+# Shared by all event-loops that don't bring their own to_thread or executor.
+_default_executor: t.Optional[ThreadPoolExecutor] = None
+_default_executor_lock = threading.Lock()
+
+
+def _get_default_executor() -> ThreadPoolExecutor:
+    global _default_executor
+    if _default_executor is None:
+        with _default_executor_lock:
+            if _default_executor is None:
+                # Idle workers are reused, but a new one is started whenever all of them are busy.
+                # Like a thread per call, functions that wait on each other can't deadlock the pool.
+                _default_executor = ThreadPoolExecutor(
+                    max_workers=sys.maxsize,
+                    thread_name_prefix="vsengine-worker"
+                )
+                atexit.register(_default_executor.shutdown)
+    return _default_executor
+
+
 class EventLoop:
     """
     These functions must be implemented to bridge VapourSynth
     with the event-loop of your choice.
     """
 
+    # The executor the default to_thread submits to.
+    # None uses a pool shared by all event-loops.
+    executor: t.Optional[Executor] = None
+
     def attach(self) -> None:
         """
         Called when set_loop is run.
@@ -68,21 +116,10 @@ class EventLoop:
         """
         Run this function in a worker thread.
         """
-        fut = Future()
-        def wrapper():
-            if not fut.set_running_or_notify_cancel():
-                return
-
-            try:
-                result = func(*args, **kwargs)
-            except BaseException as e:
-                fut.set_exception(e)
-            else:
-                fut.set_result(result)
-
-        import threading
-        threading.Thread(target=wrapper).start()
-        return fut
+        executor = self.executor
+        if executor is None:
+            executor = _get_default_executor()
+        return executor.submit(func, *args, **kwargs)
 
     def next_cycle(self) -> Future[None]:
         """
@@ -108,15 +145,11 @@ class EventLoop:
         """
         raise NotImplementedError
 
-    @contextlib.contextmanager
-    def wrap_cancelled(self):
+    def wrap_cancelled(self) -> t.ContextManager[None]:
         """
         Wraps vsengine.loops.Cancelled into the native cancellation error.
         """
-        try:
-            yield
-        except Cancelled:
-            raise CancelledError from None
+        return _WRAP_CANCELLED
 
 
 class _NoEventLoop(EventLoop):
@@ -124,6 +157,13 @@ class _NoEventLoop(EventLoop):
     This is the default event-loop used by 
     """
 
+    def __init__(self, executor: t.Optional[Executor] = None) -> None:
+        """
+        :param executor: The executor to_thread runs its functions in.
+                         Defaults to a pool shared by all event-loops.
+        """
+        self.executor = executor
+
     def attach(self) -> None:
         pass
 
@@ -178,6 +218,14 @@ def set_loop(loop: EventLoop) -> None:
         raise
 
 
+def _current_environment() -> t.Callable[[], t.ContextManager[t.Any]]:
+    # The environment can change between calls, so it can't be cached.
+    try:
+        return vapoursynth.get_current_environment().use
+    except RuntimeError:
+        return _noop
+
+
 def keep_environment(func: t.Callable[..., T]) -> t.Callable[..., T]:
     """
     This decorator will return a function that keeps the environment
@@ -186,10 +234,7 @@ def keep_environment(func: t.Callable[..., T]) -> t.Callable[..., T]:
     :param func: A function to decorate.
     :returns: A wrapped function that keeps the environment.
     """
-    try:
-        environment = vapoursynth.get_current_environment().use
-    except RuntimeError:
-        environment = _noop
+    environment = _current_environment()
 
     @functools.wraps(func)
     def _wrapper(*args, **kwargs):
@@ -211,12 +256,15 @@ def from_thread(func: t.Callable[..., T], *args: t.Any, **kwargs: t.Any) -> Futu
     :param kwargs: The keyword arguments to pass to the function.
     :return: A future that resolves and reject depending on the outcome.
     """
+    # Like keep_environment, but without copying the metadata of a throwaway function.
+    environment = _current_environment()
 
-    @keep_environment
     def _wrapper():
-        return func(*args, **kwargs)
+        with environment():
+            return func(*args, **kwargs)
 
-    return get_loop().from_thread(_wrapper)
+    # Read the global directly instead of calling get_loop.
+    return current_loop.from_thread(_wrapper)
 
 
 def to_thread(func: t.Callable[..., t.Any], *args: t.Any, **kwargs: t.Any) -> t.Any:
@@ -229,11 +277,13 @@ def to_thread(func: t.Callable[..., t.Any], *args: t.Any, **kwargs: t.Any) -> t.
     :param kwargs: The keyword arguments to pass to the function.
     :return: An loop-specific object.
     """
-    @keep_environment
+    environment = _current_environment()
+
     def _wrapper():
-        return func(*args, **kwargs)
-    
-    return get_loop().to_thread(_wrapper)
+        with environment():
+            return func(*args, **kwargs)
+
+    return current_loop.to_thread(_wrapper)
 
 
 async def make_awaitable(future: Future[T]) -> T:
@@ -243,5 +293,5 @@ async def make_awaitable(future: Future[T]) -> T:
     :param future: The future to make awaitable.
     :return: An object that can be awaited.
     """
-    return t.cast(T, await get_loop().await_future(future))
+    return t.cast(T, await current_loop.await_future(future))
 
@@ -141,15 +141,21 @@ class ContextVarStore(EnvironmentStore):
     If you are using AsyncIO or similar frameworks, use this store.
     """
     _current: contextvars.ContextVar[t.Optional[EnvironmentData]]
+    _get: t.Callable[[t.Optional[EnvironmentData]], t.Optional[EnvironmentData]]
+    _set: t.Callable[[t.Optional[EnvironmentData]], t.Any]
 
     def __init__(self, name: str="vapoursynth") -> None:
         self._current = contextvars.ContextVar(name)
+        # The store is consulted on every environment switch.
+        # Bind the accessors once.
+        self._get = self._current.get
+        self._set = self._current.set
 
     def set_current_environment(self, environment: t.Optional[EnvironmentData]):
-        self._current.set(environment)
+        self._set(environment)
 
     def get_current_environment(self) -> t.Optional[EnvironmentData]:
-        return self._current.get(None)
+        return self._get(None)
 
 
 class _ManagedPolicy(EnvironmentPolicy):